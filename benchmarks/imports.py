@@ -0,0 +1,108 @@
+#! /usr/bin/env python3
+"""
+Benchmark the cold start of the pyphlow entry points.
+
+Every entry point is imported in a fresh interpreter several times. The
+fastest import time is compared against its budget, and the modules it must
+not load, e.g. kivy for the headless commands, are checked. The exit status is
+1 if any entry point is over budget or loads a forbidden module.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# entry points mapped to their import time budget in milliseconds and the
+# packages they must not import
+ENTRY_POINTS = {
+    "pyphlow.data.picturehandling": (100, ("kivy", "PIL", "numpy")),
+    "pyphlow.tools.scan": (100, ("kivy", "PIL", "numpy")),
+    "pyphlow.tools.apply": (100, ("kivy", "PIL", "numpy")),
+    "pyphlow.tools.remove": (100, ("kivy", "PIL", "numpy")),
+    "pyphlow.tools.warm": (100, ("kivy", "PIL", "numpy")),
+    "pyphlow.tools.importer": (150, ("kivy", "PIL", "numpy")),
+    "pyphlow.tools.exporter": (100, ("kivy", "PIL", "numpy")),
+    "pyphlow.app.app": (3000, ()),
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{
+    "ms": (time.perf_counter() - start) * 1000,
+    "forbidden": sorted({{name.split('.')[0] for name in sys.modules}}
+                        & set({forbidden!r})),
+}}))
+"""
+
+
+def measure(module: str, forbidden=(), repeat: int = 5) -> dict:
+    """
+    Import a module in fresh interpreters.
+
+    Returns:
+        dict: fastest import time in milliseconds, the forbidden packages
+            which were imported and the error if the import failed
+    """
+    times = []
+    loaded = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c",
+             _PROBE.format(module=module, forbidden=tuple(forbidden))],
+            capture_output=True,
+            text=True)
+        if result.returncode:
+            return {"error": result.stderr.strip().splitlines()[-1]}
+        probe = json.loads(result.stdout)
+        times.append(probe["ms"])
+        loaded = probe["forbidden"]
+
+    return {"ms": min(times), "forbidden": loaded}
+
+
+def run(entry_points=None, repeat: int = 5) -> dict:
+    results = {}
+    for module, (budget, forbidden) in ENTRY_POINTS.items():
+        if entry_points and module not in entry_points:
+            continue
+        result = measure(module, forbidden, repeat)
+        result["budget_ms"] = budget
+        result["ok"] = ("error" not in result and result["ms"] <= budget
+                        and not result["forbidden"])
+        results[module] = result
+
+    return results
+
+
+def _print(results: dict):
+    for module, result in results.items():
+        status = "ok" if result["ok"] else "FAIL"
+        if "error" in result:
+            print(f"{status:4} {module}: {result['error']}")
+            continue
+        forbidden = (f", imports {', '.join(result['forbidden'])}"
+                     if result["forbidden"] else "")
+        print(f"{status:4} {module}: {result['ms']:.1f} ms of "
+              f"{result['budget_ms']} ms{forbidden}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("entry_points", nargs="*", metavar="module",
+                        help="only measure these entry points")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    unknown = set(args.entry_points) - set(ENTRY_POINTS)
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(sorted(unknown))}")
+
+    results = run(args.entry_points, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print(results)
+
+    sys.exit(0 if all(result["ok"] for result in results.values()) else 1)
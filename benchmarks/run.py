@@ -0,0 +1,210 @@
+#! /usr/bin/env python3
+"""
+Benchmark the hot paths of pyphlow on synthetic shoots.
+
+For every shoot size the scan time of load_pictures (with and without
+catalog), the time until the first and all pictures are shown when loading
+in the background, the time to apply rejects, orientation reads per second,
+memory per Picture, headless navigation throughput including the lookup and
+decoding of the shown preview and the rate of skipping to the next undecided
+picture are reported.
+"""
+import argparse
+import json
+import os
+import queue
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.shoot import generate
+from pyphlow.data.catalog import CATALOG_DIR, Catalog
+from pyphlow.data.exif import read_orientation
+from pyphlow.data.picturehandling import (Mode, PictureManager, load_pictures,
+                                          undo_actions)
+from pyphlow.data.previews import PreviewCache, decode_picture
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def _age(root: str):
+    # the catalog does not trust directories modified within the last
+    # seconds, so the generated tree is made to look older
+    past = time.time() - 3600
+    for path, dirs, files in os.walk(root):
+        os.utime(path, (past, past))
+
+
+def bench_scan(root: str) -> dict:
+    results = {}
+    for mode in Mode:
+        shutil.rmtree(os.path.join(root, CATALOG_DIR), ignore_errors=True)
+        cold, pictures = _timed(load_pictures, root, mode)
+        warm, _ = _timed(load_pictures, root, mode)
+        results[mode.name] = {
+            "pictures": len(pictures),
+            "cold_s": cold,
+            "catalog_s": warm,
+        }
+
+    return results
+
+
+def bench_startup(root: str) -> dict:
+    results = {}
+    for catalog in ("cold", "catalog"):
+        if catalog == "cold":
+            shutil.rmtree(os.path.join(root, CATALOG_DIR), ignore_errors=True)
+
+        batches = queue.Queue()
+        start = time.perf_counter()
+        manager = PictureManager(root, Mode.CATEGORIZING,
+                                 lambda *batch: batches.put(batch))
+        first = None
+        done = False
+        while not done:
+            mode, pictures, done = batches.get()
+            manager.add_loaded(mode, pictures, done)
+            if first is None and pictures:
+                first = time.perf_counter() - start
+
+        results[catalog] = {
+            "first_s": first,
+            "all_s": time.perf_counter() - start,
+        }
+
+    return results
+
+
+def bench_apply(root: str, share: float = .1) -> dict:
+    manager = PictureManager(root, Mode.CATEGORIZING)
+    pictures = list(manager._pictures)
+    rejected = pictures[::max(1, int(1 / share))]
+    for picture in rejected:
+        picture.reject()
+
+    duration, _ = _timed(manager.apply)
+    undo, _ = _timed(undo_actions, root)
+
+    return {
+        "rejected": len(rejected),
+        "apply_s": duration,
+        "undo_s": undo,
+    }
+
+
+def bench_orientation(root: str) -> dict:
+    jpg_path = os.path.join(root, "src", "jpg")
+    paths = [os.path.join(jpg_path, name) for name in os.listdir(jpg_path)]
+
+    parse, _ = _timed(lambda: [read_orientation(path) for path in paths])
+
+    return {"parse_per_s": len(paths) / parse}
+
+
+def bench_memory(root: str) -> dict:
+    with Catalog(root) as catalog:
+        load_pictures(root, Mode.EDITING, catalog)
+
+        tracemalloc.start()
+        pictures = load_pictures(root, Mode.EDITING, catalog)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {"bytes_per_picture": size / len(pictures)}
+
+
+def bench_navigation(root: str, steps: int = 10000, radius: int = 3) -> dict:
+    manager = PictureManager(root, Mode.CATEGORIZING)
+    previews = PreviewCache(root)
+    previews.warm(picture.preview for picture in manager if picture.preview)
+
+    def navigate():
+        for step in range(steps):
+            picture = manager.next if step % 10 else manager.previous
+            # what the viewer shows, the preview or the picture itself
+            source = previews.lookup(picture.preview) or picture.preview
+            if source:
+                decode_picture(source, previews.size)
+            for offset in range(-radius, radius + 1):
+                manager.peek(offset)
+
+    duration, _ = _timed(navigate)
+    return {"steps_per_s": steps / duration}
+
+
+def bench_culling(root: str, steps: int = 10000, share: float = .9) -> dict:
+    manager = PictureManager(root, Mode.CATEGORIZING)
+    for index in range(int(len(manager) * share)):
+        manager.jump(index).reject()
+
+    def skip():
+        for step in range(steps):
+            manager.next_matching("unrated", 1 if step % 10 else -1)
+
+    duration, _ = _timed(skip)
+    return {"skips_per_s": steps / duration}
+
+
+BENCHMARKS = {
+    "scan": bench_scan,
+    "startup": bench_startup,
+    "apply": bench_apply,
+    "orientation": bench_orientation,
+    "memory": bench_memory,
+    "navigation": bench_navigation,
+    "culling": bench_culling,
+}
+
+
+def run(sizes, benchmarks=None, directory: str = None) -> dict:
+    results = {}
+    for size in sizes:
+        root = tempfile.mkdtemp(prefix=f"pyphlow-bench-{size}-",
+                                dir=directory)
+        try:
+            generate(root, size)
+            _age(root)
+
+            results[size] = {}
+            for name, benchmark in BENCHMARKS.items():
+                if benchmarks and name not in benchmarks:
+                    continue
+                results[size][name] = benchmark(root)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return results
+
+
+def _print(results: dict):
+    for size, benchmarks in results.items():
+        print(f"{size} pictures")
+        for name, result in benchmarks.items():
+            print(f"  {name}")
+            for key, value in result.items():
+                if isinstance(value, dict):
+                    value = ", ".join(f"{k}={v:.4g}" for k, v in value.items())
+                elif isinstance(value, float):
+                    value = f"{value:.4g}"
+                print(f"    {key}: {value}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("sizes", type=int, nargs="*", default=[1000, 10000])
+    parser.add_argument("--only", action="append", choices=BENCHMARKS)
+    parser.add_argument("--dir", help="directory to generate the shoots in")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.only, args.dir)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print(results)
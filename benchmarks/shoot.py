@@ -0,0 +1,144 @@
+#! /usr/bin/env python3
+"""
+Generate synthetic shoots for benchmarking.
+
+The generated tree has the layout load_pictures expects: src/jpg, src/arw
+with xmp sidecars, edit/<name>/ versions and export/public|private. All
+pictures are tiny but valid JPEG files with an EXIF orientation, raw files
+are TIFF structures with an embedded JPEG preview.
+"""
+import argparse
+import os
+import random
+import struct
+
+_ORIENTATIONS = (1, 1, 1, 6, 8, 3)
+
+
+def _segment(marker: int, payload: bytes) -> bytes:
+    return bytes((0xFF, marker)) + struct.pack('>H', len(payload) + 2) + payload
+
+
+def _exif(orientation: int) -> bytes:
+    tiff = (b'II' + struct.pack('<HI', 42, 8) + struct.pack('<H', 1) +
+            struct.pack('<HHIHH', 0x0112, 3, 1, orientation, 0) +
+            struct.pack('<I', 0))
+    return _segment(0xE1, b'Exif\0\0' + tiff)
+
+
+def make_jpeg(orientation: int = 1, width: int = 64, height: int = 48) -> bytes:
+    """
+    Encode a uniform grey baseline JPEG.
+
+    Every 8x8 block has only a zero DC difference and an end of block, so both
+    Huffman tables need a single one bit code.
+    """
+    blocks = ((width + 7) // 8) * ((height + 7) // 8)
+    bits = "00" * blocks
+    bits += "1" * (-len(bits) % 8)
+    scan = bytes(int(bits[i:i + 8], 2) for i in range(0, len(bits), 8))
+    # stuff zero bytes after 0xFF in the entropy coded data
+    scan = scan.replace(b'\xff', b'\xff\x00')
+
+    huffman = bytes((1, ) + (0, ) * 15 + (0, ))
+
+    return (b'\xff\xd8' + _exif(orientation) +
+            _segment(0xDB, b'\x00' + b'\x01' * 64) +
+            _segment(0xC0, struct.pack('>BHHB', 8, height, width, 1) +
+                     b'\x01\x11\x00') +
+            _segment(0xC4, b'\x00' + huffman) +
+            _segment(0xC4, b'\x10' + huffman) +
+            _segment(0xDA, b'\x01\x01\x00\x00\x3f\x00') + scan + b'\xff\xd9')
+
+
+def make_raw(orientation: int, preview: bytes) -> bytes:
+    """Build a TIFF based raw file with an embedded JPEG preview."""
+    entries = ((0x0112, 3, orientation), (0x0201, 4, None), (0x0202, 4,
+                                                             len(preview)))
+    ifd_size = 2 + 12 * len(entries) + 4
+    preview_offset = 8 + ifd_size
+
+    ifd = struct.pack('<H', len(entries))
+    for tag, field_type, value in entries:
+        if value is None:
+            value = preview_offset
+        if field_type == 3:
+            ifd += struct.pack('<HHIHH', tag, field_type, 1, value, 0)
+        else:
+            ifd += struct.pack('<HHII', tag, field_type, 1, value)
+    ifd += struct.pack('<I', 0)
+
+    # stand in for the sensor data
+    sensor = bytes(4096)
+
+    return b'II' + struct.pack('<HI', 42, 8) + ifd + preview + sensor
+
+
+def generate(root: str,
+             count: int,
+             raw_only: float = .05,
+             edited: float = .05,
+             public: float = .1,
+             private: float = .05,
+             seed: int = 0):
+    """
+    Generate a shoot.
+
+    Args:
+        root: directory to create the shoot in
+        count: number of pictures in src
+        raw_only: share of pictures without a jpg
+        edited: share of pictures with edit versions
+        public: share of pictures exported publicly
+        private: share of pictures exported privately
+        seed: seed of the random choices
+    """
+    rnd = random.Random(seed)
+
+    for directory in ("src/jpg", "src/arw", "edit", "export/public",
+                      "export/private"):
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+
+    jpegs = {o: make_jpeg(o) for o in set(_ORIENTATIONS)}
+    raws = {o: make_raw(o, jpegs[o]) for o in set(_ORIENTATIONS)}
+    xmp = b'<x:xmpmeta xmlns:x="adobe:ns:meta/"></x:xmpmeta>\n'
+
+    for i in range(count):
+        name = f"DSC{i:05d}"
+        orientation = rnd.choice(_ORIENTATIONS)
+
+        _write(os.path.join(root, "src", "arw", f"{name}.ARW"),
+               raws[orientation])
+        _write(os.path.join(root, "src", "arw", f"{name}.ARW.xmp"), xmp)
+        if rnd.random() >= raw_only:
+            _write(os.path.join(root, "src", "jpg", f"{name}.JPG"),
+                   jpegs[orientation])
+
+        if rnd.random() < edited:
+            for version in range(1, rnd.randint(2, 4)):
+                _write(
+                    os.path.join(root, "edit", name,
+                                 f"{name}_v{version}.jpg"), jpegs[1])
+
+        if rnd.random() < public:
+            _write(os.path.join(root, "export", "public", f"{name}.jpg"),
+                   jpegs[orientation])
+        elif rnd.random() < private:
+            _write(os.path.join(root, "export", "private", f"{name}.jpg"),
+                   jpegs[orientation])
+
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("root")
+    parser.add_argument("count", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate(args.root, args.count, seed=args.seed)
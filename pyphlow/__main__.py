@@ -1,11 +1,51 @@
 #! /usr/bin/env python3
-
+import argparse
+import importlib
 import os
 import sys
 
-from pyphlow.app import run_app
+# commands mapped to the module providing their cli() and a description. Only
+# the module of the chosen command is imported, so the commands but view
+# start without loading kivy
+COMMANDS = {
+    "view": ("pyphlow.app.app", "view and categorize the pictures of a shoot"),
+    "scan": ("pyphlow.tools.scan",
+             "scan a shoot and store its picture lists in the catalog"),
+    "apply": ("pyphlow.tools.apply", "apply a file of decisions to a shoot"),
+    "remove": ("pyphlow.tools.remove",
+               "reject the pictures listed in rejected.txt of a shoot"),
+    "warm": ("pyphlow.tools.warm",
+             "scan a shoot and generate its previews ahead of viewing"),
+    "import": ("pyphlow.tools.importer",
+               "copy the pictures of a memory card into a shoot"),
+    "export": ("pyphlow.tools.exporter",
+               "export the pictures of a shoot in the sizes of presets"),
+}
+
+
+def main(args):
+    # python -m pyphlow <path> views the shoot
+    if args and args[0] not in COMMANDS and not args[0].startswith('-'):
+        args = ["view"] + args
+
+    parser = argparse.ArgumentParser(
+        prog="python -m pyphlow",
+        description="Organize the pictures of a shoot.",
+        epilog="Run a command with -h for its arguments.")
+    subparsers = parser.add_subparsers(dest="command",
+                                       metavar="command",
+                                       required=True)
+    for name, (_, description) in COMMANDS.items():
+        subparsers.add_parser(name, help=description, add_help=False)
+    namespace, rest = parser.parse_known_args(args)
+
+    if namespace.command == "view":
+        # the arguments are parsed here, not by kivy
+        os.environ.setdefault("KIVY_NO_ARGS", "1")
+
+    module = importlib.import_module(COMMANDS[namespace.command][0])
+    module.cli(rest)
+
 
-if sys.argv[1]:
-    run_app(sys.argv[1])
-else:
-    print("python -m pyphlow <path>")
+if __name__ == '__main__':
+    main(sys.argv[1:])
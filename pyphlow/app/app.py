@@ -1,4 +1,6 @@
+import argparse
 import os
+import time
 
 from kivy import Config
 from kivy.app import App
@@ -6,6 +8,7 @@ from kivy.core.window import Window
 from kivy.properties import StringProperty
 from kivy.uix.screenmanager import ScreenManager
 
+from pyphlow import instrument
 from pyphlow.app.viewer import ViewScreen
 
 
@@ -21,10 +24,23 @@ class PhlowManager(ScreenManager):
         self._keyboard = None
 
     def _on_key_down(self, keyboard, keycode, text, modifiers):
-        print(keyboard, keycode, text, modifiers)
+        if instrument.enabled():
+            self._measure_key_to_frame(keycode[1])
 
         self.current_screen._on_key_down(keyboard, keycode, text, modifiers)
 
+    def _measure_key_to_frame(self, key):
+        start = time.perf_counter()
+
+        def on_flip(*args):
+            Window.unbind(on_flip=on_flip)
+            instrument.record("key_to_frame",
+                              time.perf_counter() - start,
+                              start,
+                              key=key)
+
+        Window.bind(on_flip=on_flip)
+
 
 class PhlowApp(App):
     _path = StringProperty("")
@@ -50,5 +66,15 @@ def main(path):
     PhlowApp(path=path).run()
 
 
+def cli(args):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyphlow view",
+        description="View and categorize the pictures of a shoot.")
+    parser.add_argument("root", help="root of the shoot")
+    args = parser.parse_args(args)
+
+    main(args.root)
+
+
 if __name__ == '__main__':
     main("/wrong_path")
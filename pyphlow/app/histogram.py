@@ -0,0 +1,69 @@
+from kivy.graphics import Color, Line, Rectangle
+from kivy.properties import ObjectProperty
+from kivy.uix.widget import Widget
+
+from pyphlow.data.histogram import BINS, CLIP_WARNING
+
+# colors of the curves of the channels of a Histogram
+CURVES = (
+    ("red", (.9, .3, .3, .8)),
+    ("green", (.3, .9, .3, .8)),
+    ("blue", (.4, .5, 1, .8)),
+    ("luma", (.9, .9, .9, .9)),
+)
+
+# width of the clipping indicators at the ends of the histogram
+_INDICATOR_WIDTH = 6
+
+
+class HistogramOverlay(Widget):
+    """
+    Curves of the RGB and luma histogram of a picture with clipping
+    indicators.
+
+    The indicator on the left lights up if too many pixels are black, the one
+    on the right if too many are white.
+    """
+    histogram = ObjectProperty(None, allownone=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.fbind('histogram', self._draw)
+        self.fbind('pos', self._draw)
+        self.fbind('size', self._draw)
+
+    def _draw(self, *largs):
+        self.canvas.clear()
+        histogram = self.histogram
+        if histogram is None:
+            return
+
+        with self.canvas:
+            Color(.1, .1, .1, .7)
+            Rectangle(pos=self.pos, size=self.size)
+
+            left = self.x + _INDICATOR_WIDTH
+            width = self.width - 2 * _INDICATOR_WIDTH
+            # the clipped ends would flatten everything else
+            top = max(max(getattr(histogram, name)[1:-1])
+                      for name, _ in CURVES) or 1
+            for name, color in CURVES:
+                values = getattr(histogram, name)
+                points = []
+                for value_index, share in enumerate(values):
+                    points += [
+                        left + value_index * width / (BINS - 1),
+                        self.y + min(share / top, 1) * self.height,
+                    ]
+                Color(*color)
+                Line(points=points, width=1)
+
+            for share, x in ((histogram.shadows, self.x),
+                             (histogram.highlights, self.right -
+                              _INDICATOR_WIDTH)):
+                if share >= CLIP_WARNING:
+                    Color(1, .2, .2, 1)
+                else:
+                    Color(.3, .3, .3, .7)
+                Rectangle(pos=(x, self.y),
+                          size=(_INDICATOR_WIDTH, self.height))
@@ -0,0 +1,228 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import Clock
+from kivy.graphics.texture import Texture
+
+from pyphlow import instrument
+from pyphlow.data.previews import decode_picture
+
+
+class TexturePool:
+    """
+    Textures which are no longer used, kept to be filled with other pictures.
+
+    Pictures decoded at the size of the viewer mostly have the same size, so
+    a texture of the right size is usually available and a picture is shown
+    by uploading its pixels without allocating a texture.
+    """
+
+    def __init__(self, max_textures: int = 8):
+        self.max_textures = max_textures
+        self._free = OrderedDict()
+
+    def __len__(self):
+        return sum(len(textures) for textures in self._free.values())
+
+    def acquire(self, size: tuple):
+        """Return an unused texture of a size, creating one if needed."""
+        textures = self._free.get(size)
+        if textures:
+            instrument.count("texture.reused")
+            texture = textures.pop()
+            if not textures:
+                del self._free[size]
+            return texture
+
+        instrument.count("texture.created")
+        texture = Texture.create(size=size, colorfmt='rgb')
+        # pixels are uploaded from the top row down, the texture is flipped
+        # once and stays flipped when it is reused
+        texture.flip_vertical()
+        return texture
+
+    def release(self, texture):
+        """Return a texture which is no longer displayed."""
+        self._free.setdefault(tuple(texture.size), []).append(texture)
+        self._free.move_to_end(tuple(texture.size))
+        while len(self) > self.max_textures:
+            size, textures = next(iter(self._free.items()))
+            textures.pop(0)
+            if not textures:
+                del self._free[size]
+
+    def upload(self, size: tuple, pixels: bytes):
+        """
+        Create a texture from a decoded picture.
+
+        Args:
+            size: width and height of the picture
+            pixels: RGB bytes as returned by decode_picture()
+        """
+        texture = self.acquire(size)
+        texture.blit_buffer(pixels, colorfmt='rgb', bufferfmt='ubyte')
+        return texture
+
+
+class TextureCache:
+    """
+    Least recently used cache of textures, bounded by their size in bytes.
+
+    Evicted textures are given back to a TexturePool.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024**2, pool=None):
+        self.max_bytes = max_bytes
+        self.pool = pool
+        self._textures = OrderedDict()
+        self._size = 0
+
+    def __contains__(self, path):
+        return path in self._textures
+
+    def __len__(self):
+        return len(self._textures)
+
+    @property
+    def size(self):
+        """
+        int: bytes used by all cached textures
+        """
+        return self._size
+
+    def get(self, key):
+        texture = self._textures.get(key)
+        if texture is not None:
+            self._textures.move_to_end(key)
+        return texture
+
+    def put(self, key, texture):
+        if key in self._textures:
+            self._evicted(self._textures.pop(key))
+
+        self._textures[key] = texture
+        self._size += _texture_bytes(texture)
+
+        # the most recently used texture is the displayed one and never
+        # evicted
+        while self._size > self.max_bytes and len(self._textures) > 1:
+            _, evicted = self._textures.popitem(last=False)
+            self._evicted(evicted)
+
+    def _evicted(self, texture):
+        self._size -= _texture_bytes(texture)
+        if self.pool is not None:
+            self.pool.release(texture)
+
+
+def _texture_bytes(texture) -> int:
+    width, height = texture.size
+    return width * height * 3
+
+
+class Prefetcher:
+    """
+    Decode the neighbours of the current picture ahead of time.
+
+    Pictures are resolved and decoded at the size of the viewer in a thread
+    pool, the decoded pixels are uploaded into pooled textures on the main
+    thread and put into a TextureCache under their path and size.
+    """
+
+    def __init__(self,
+                 cache: TextureCache,
+                 source,
+                 radius: int = 3,
+                 workers: int = 2,
+                 size: tuple = (1920, 1080)):
+        """
+        Args:
+            cache: cache the prefetched textures are put into, with the pool
+                the textures are taken from
+            source: function returning the path to display for a picture,
+                called from the worker threads
+            radius: number of pictures to prefetch in each direction
+            workers: number of decoding threads
+            size: size the pictures are decoded at, updated when the viewer
+                is resized
+        """
+        self.cache = cache
+        self.radius = radius
+        self.size = tuple(size)
+        self._source = source
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = {}
+        self._direction = 1
+
+    def update(self, manager, direction: int = 1):
+        """
+        Prefetch the pictures around the current picture of a manager.
+
+        Pending prefetches are cancelled if the direction of travel changed or
+        they are no longer close to the current picture.
+
+        Args:
+            manager: PictureManager whose current picture is displayed
+            direction: 1 when moving forward, -1 when moving backward
+        """
+        if direction != self._direction:
+            self._direction = direction
+            self.cancel()
+
+        # the pictures ahead of the direction of travel come first
+        offsets = [direction * step for step in range(1, self.radius + 1)]
+        offsets += [-offset for offset in offsets]
+
+        wanted = []
+        for offset in offsets:
+            picture = manager.peek(offset)
+            if picture not in wanted:
+                wanted.append(picture)
+
+        for picture, future in list(self._pending.items()):
+            if picture not in wanted and future.cancel():
+                del self._pending[picture]
+
+        for picture in wanted:
+            if picture in self._pending:
+                continue
+
+            future = self._executor.submit(self._load, picture)
+            future.add_done_callback(
+                lambda future, picture=picture: Clock.schedule_once(
+                    lambda dt: self._finish(picture, future)))
+            self._pending[picture] = future
+
+    def cancel(self):
+        """Cancel all prefetches that have not started yet."""
+        for picture, future in list(self._pending.items()):
+            if future.cancel():
+                del self._pending[picture]
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _load(self, picture):
+        key = (self._source(picture), self.size)
+        if key in self.cache:
+            return key, None
+
+        # only decodes into memory, the texture has to be filled on the main
+        # thread which owns the OpenGL context
+        with instrument.span("decode", picture=picture.name):
+            return key, decode_picture(*key)
+
+    def _finish(self, picture, future):
+        if self._pending.get(picture) is not future:
+            return
+        del self._pending[picture]
+
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        key, decoded = future.result()
+        # the viewer may have loaded the picture itself in the meantime
+        if decoded is not None and key not in self.cache:
+            with instrument.span("texture", picture=picture.name):
+                self.cache.put(key, self.cache.pool.upload(*decoded))
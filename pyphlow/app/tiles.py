@@ -0,0 +1,237 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import Clock
+from PIL import Image as PILImage
+
+from pyphlow import instrument
+from pyphlow.app.prefetch import TextureCache, TexturePool
+from pyphlow.data.previews import TRANSPOSED
+
+# width and height of a tile in pixels of its level
+TILE_SIZE = 512
+
+# denominators of the scales pictures are decoded at, the scales a JPEG
+# decoder can reduce to without decoding the full picture
+LEVELS = (8, 4, 2, 1)
+
+# transpositions turning a picture of an EXIF orientation upright
+_UPRIGHT = {
+    2: PILImage.FLIP_LEFT_RIGHT,
+    3: PILImage.ROTATE_180,
+    4: PILImage.FLIP_TOP_BOTTOM,
+    5: PILImage.TRANSPOSE,
+    6: PILImage.ROTATE_270,
+    7: PILImage.TRANSVERSE,
+    8: PILImage.ROTATE_90,
+}
+
+
+def level_for(scale: float) -> int:
+    """
+    Return the level to decode at for a display scale.
+
+    Args:
+        scale: displayed pixels per pixel of the full picture
+
+    Returns:
+        int: denominator of the smallest scale not below the display scale
+    """
+    for denominator in LEVELS:
+        if 1 / denominator >= scale:
+            return denominator
+    return 1
+
+
+def level_size(size: tuple, level: int) -> tuple:
+    """Return the size of a picture decoded at a level."""
+    width, height = size
+    return -(-width // level), -(-height // level)
+
+
+def tile_box(size: tuple, column: int, row: int) -> tuple:
+    """
+    Returns:
+        tuple: left, top, right and bottom of a tile in a picture of a size
+    """
+    left, top = column * TILE_SIZE, row * TILE_SIZE
+    return (left, top, min(left + TILE_SIZE, size[0]),
+            min(top + TILE_SIZE, size[1]))
+
+
+def visible_tiles(size: tuple, region: tuple):
+    """
+    Return the tiles covering a region of a picture.
+
+    Args:
+        size: size of the picture at its level
+        region: left, top, right and bottom of the region in pixels of the
+            level
+
+    Returns:
+        tuple: ranges of the columns and rows of the tiles
+    """
+    left, top, right, bottom = region
+    columns = -(-size[0] // TILE_SIZE)
+    rows = -(-size[1] // TILE_SIZE)
+    return (range(max(0, int(left // TILE_SIZE)),
+                  min(columns, int(-(-right // TILE_SIZE)))),
+            range(max(0, int(top // TILE_SIZE)),
+                  min(rows, int(-(-bottom // TILE_SIZE)))))
+
+
+def ahead(columns: range, rows: range, direction: tuple, size: tuple):
+    """
+    Return the tiles next to the visible ones in the direction of panning.
+
+    Args:
+        columns: visible columns
+        rows: visible rows
+        direction: signs of the horizontal and vertical panning, in pixels of
+            the picture
+        size: size of the picture at its level
+
+    Returns:
+        list: columns and rows of the tiles to prefetch
+    """
+    dx, dy = direction
+    tiles = []
+    if dx:
+        column = columns.stop if dx > 0 else columns.start - 1
+        if 0 <= column < -(-size[0] // TILE_SIZE):
+            tiles += [(column, row) for row in rows]
+    if dy:
+        row = rows.stop if dy > 0 else rows.start - 1
+        if 0 <= row < -(-size[1] // TILE_SIZE):
+            tiles += [(column, row) for column in columns]
+    return tiles
+
+
+def full_size(path: str) -> tuple:
+    """Return the upright size of a picture, only reading its header."""
+    with PILImage.open(path) as img:
+        width, height = img.size
+        if img.getexif().get(0x0112) in TRANSPOSED:
+            width, height = height, width
+    return width, height
+
+
+def decode_level(path: str, level: int):
+    """
+    Decode a picture upright at a level.
+
+    JPEG pictures are decoded at the reduced scale directly, other pictures
+    are decoded fully and scaled down.
+
+    Returns:
+        PIL.Image.Image: the RGB picture with the size of level_size()
+    """
+    with PILImage.open(path) as img:
+        orientation = img.getexif().get(0x0112)
+        size = level_size(img.size, level)
+        img.draft('RGB', size)
+        picture = img.convert('RGB')
+
+    if picture.size != size:
+        picture = picture.resize(size, PILImage.BILINEAR)
+    if orientation in _UPRIGHT:
+        picture = picture.transpose(_UPRIGHT[orientation])
+    return picture
+
+
+class TileLoader:
+    """
+    Load tiles of full resolution pictures in the background.
+
+    A picture is decoded once per level and kept while its tiles are loaded,
+    only the requested tiles are cut out and uploaded into textures. Tiles
+    are kept in a TextureCache under the path, level, column and row, so
+    their textures are reused from a TexturePool when they are evicted.
+    """
+
+    def __init__(self, max_bytes: int = 192 * 1024**2, workers: int = 2):
+        """
+        Args:
+            max_bytes: size of the tile cache
+            workers: number of threads cutting tiles
+        """
+        self.cache = TextureCache(max_bytes, pool=TexturePool(16))
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = {}
+        self._sizes = {}
+
+        self._lock = threading.Lock()
+        self._level = None
+        self._picture = None
+
+    def size(self, path: str) -> tuple:
+        """Return the upright size of a picture, cached per path."""
+        size = self._sizes.get(path)
+        if size is None:
+            size = self._sizes[path] = full_size(path)
+        return size
+
+    def request(self, keys, on_loaded):
+        """
+        Load tiles which are not cached yet.
+
+        Pending tiles which are no longer requested are cancelled.
+
+        Args:
+            keys: path, level, column and row of the tiles, the most urgent
+                first
+            on_loaded: function called with the key of every loaded tile on
+                the main thread
+        """
+        keys = [key for key in keys if key not in self.cache]
+        wanted = set(keys)
+        for key, future in list(self._pending.items()):
+            if key not in wanted and future.cancel():
+                del self._pending[key]
+
+        for key in keys:
+            if key in self._pending:
+                continue
+            future = self._executor.submit(self._load, key)
+            future.add_done_callback(
+                lambda future, key=key: Clock.schedule_once(
+                    lambda dt: self._finish(key, future, on_loaded)))
+            self._pending[key] = future
+
+    def release(self):
+        """Cancel pending tiles and free the decoded picture."""
+        for key, future in list(self._pending.items()):
+            if future.cancel():
+                del self._pending[key]
+        with self._lock:
+            self._level = self._picture = None
+
+    def shutdown(self):
+        self.release()
+        self._executor.shutdown(wait=False)
+
+    def _decoded(self, path: str, level: int):
+        with self._lock:
+            if self._level != (path, level):
+                with instrument.span("tile_decode", path=path, level=level):
+                    self._picture = decode_level(path, level)
+                self._level = (path, level)
+            return self._picture
+
+    def _load(self, key):
+        path, level, column, row = key
+        picture = self._decoded(path, level)
+        tile = picture.crop(tile_box(picture.size, column, row))
+        return tile.size, tile.tobytes()
+
+    def _finish(self, key, future, on_loaded):
+        if self._pending.get(key) is not future:
+            return
+        del self._pending[key]
+
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        instrument.count("tiles.loaded")
+        self.cache.put(key, self.cache.pool.upload(*future.result()))
+        on_loaded(key)
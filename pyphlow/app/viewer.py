@@ -1,31 +1,33 @@
 import os
 import subprocess
-import sys
+import threading
 
-from kivy.properties import (AliasProperty, BoundedNumericProperty,
-                             NumericProperty, ObjectProperty, OptionProperty,
-                             StringProperty)
+from kivy.clock import Clock
+from kivy.graphics import Color, InstructionGroup, Rectangle
+from kivy.properties import (AliasProperty, BooleanProperty,
+                             BoundedNumericProperty, NumericProperty,
+                             ObjectProperty, OptionProperty, StringProperty)
 from kivy.uix.image import Image
 from kivy.uix.screenmanager import Screen
 from kivy.uix.widget import Widget
 
-from pyphlow.data.picturehandling import (Mode, Picture, PictureManager,
-                                          get_picture_angle)
+from pyphlow import instrument
+# registers the widget used in phlow.kv
+from pyphlow.app.histogram import HistogramOverlay
+from pyphlow.app.prefetch import Prefetcher, TextureCache, TexturePool
+from pyphlow.app.tiles import (TileLoader, ahead, level_for, level_size,
+                               tile_box, visible_tiles)
+from pyphlow.data.bursts import find_bursts
+from pyphlow.data.histogram import HistogramCache
+from pyphlow.data.scores import score_pictures
+from pyphlow.data.picturehandling import Mode, Picture, PictureManager
+from pyphlow.data.previews import PreviewCache, decode_picture
 
 RED = [.8, .5, .5]
 YELLOW = [.8, .8, .5]
 GREY = [.3, .3, .3]
 
 
-def jpg_path(root, name):
-    for ext in ["jpg", "JPG", "jpeg", "JPEG"]:
-        path = os.path.join(root, f"{name}.{ext}")
-        if os.path.exists(path):
-            return path
-
-    return None
-
-
 class ViewScreen(Screen):
     viewer = ObjectProperty(None)
 
@@ -34,20 +36,52 @@ class ViewScreen(Screen):
 
 
 class PhlowViewer(Widget):
-    def _get_source(self):
-        if (self._current_picture.name == "No picture available"
-                or self._current_picture.preview == ""):
+    def _source_of(self, picture):
+        """
+        Return the path to display for a picture without blocking: its
+        preview if it has been generated already, else the picture itself.
+        """
+        if picture.name == "No picture available" or picture.preview == "":
             return (f"{os.path.dirname(os.path.abspath(__file__))}"
                     f"/../res/empty.png")
 
-        return self._current_picture.preview
+        return self._previews.lookup(picture.preview) or picture.preview
+
+    def _preview_of(self, picture):
+        """
+        Return the path to display for a picture, generating its preview if
+        needed. Called from the worker threads of the prefetcher.
+        """
+        if picture.name == "No picture available" or picture.preview == "":
+            return self._source_of(picture)
+
+        return self._previews.get(picture.preview)
+
+    def _get_source(self):
+        return self._source_of(self._current_picture)
 
     source: str = AliasProperty(_get_source,
                                 None,
                                 bind=("_current_picture", ),
                                 cache=False)
 
+    def _get_full_source(self):
+        picture = self._current_picture
+        if picture.name == "No picture available":
+            return ""
+        return picture.preview
+
+    # the full resolution picture tiles are loaded from when zooming
+    full_source: str = AliasProperty(_get_full_source,
+                                     None,
+                                     bind=("_current_picture", ),
+                                     cache=False)
+
     picture_info = StringProperty()
+
+    # histogram of the current picture, shown when toggled on
+    histogram = ObjectProperty(None, allownone=True)
+    show_histogram = BooleanProperty(False)
     img = ObjectProperty(None)
 
     def _get_mode_str(self):
@@ -80,7 +114,7 @@ class PhlowViewer(Widget):
     _current_picture = ObjectProperty(Picture("No picture available", "",
                                               mode))
 
-    _path = StringProperty(sys.argv[1])
+    _path = StringProperty("")
 
     def _get_current_picture_action(self):
         if self._current_picture.action == "reject":
@@ -103,14 +137,132 @@ class PhlowViewer(Widget):
                            cache=False)
 
     def __init__(self, **kwargs):
+        # created first, _path may be set by the keyword arguments already
+        self._textures = TextureCache(pool=TexturePool())
+        self._prefetcher = Prefetcher(self._textures, self._preview_of)
+        self._histograms = HistogramCache(self._source_of)
+
+        self._burst_thread = None
+        self._score_thread = None
+
         super().__init__(**kwargs)
 
-        if not os.path.exists(self._path):
-            raise FileNotFoundError(f"Path {self._path} does not exist!!!")
+    def on__path(self, instance, path):
+        # the shoot is opened once phlow.kv has set the path, after __init__
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Path {path} does not exist!!!")
 
-        self._picture_manager = PictureManager(self._path, self.mode)
+        if self._picture_manager is not None:
+            self._picture_manager.stop_watching()
+
+        self._previews = PreviewCache(path)
+        # the first picture is shown while the others are still loading
+        self._picture_manager = PictureManager(
+            path, self.mode, lambda *batch: Clock.schedule_once(
+                lambda dt: self._on_pictures_loaded(*batch)))
 
         self._current_picture: Picture = self._picture_manager.current_picture
+        self._prefetcher.update(self._picture_manager)
+
+        self._picture_manager.watch(lambda paths: Clock.schedule_once(
+            lambda dt: self._on_files_changed(paths)))
+
+    def on_img(self, instance, img):
+        # set by phlow.kv only after __init__
+        img.texture_cache = self._textures
+        img.bind(size=self._on_img_size)
+        img.tile_loader = TileLoader()
+
+    def _on_img_size(self, img, size):
+        self._prefetcher.size = (max(1, int(size[0])), max(1, int(size[1])))
+        if self._picture_manager is not None:
+            self._prefetcher.update(self._picture_manager)
+
+    def _on_pictures_loaded(self, mode, pictures, done):
+        if self._picture_manager.add_loaded(mode, pictures, done):
+            self._current_picture = self._picture_manager.current_picture
+            self._prefetcher.update(self._picture_manager)
+
+    def _on_files_changed(self, paths):
+        if self._picture_manager.refresh(paths):
+            self._current_picture = self._picture_manager.current_picture
+            self._prefetcher.update(self._picture_manager)
+
+    def _find_bursts(self):
+        """Group the pictures into bursts in the background."""
+        if self._burst_thread is not None:
+            return
+
+        previews = [picture.preview for picture in self._picture_manager]
+
+        def run():
+            try:
+                bursts = find_bursts(self._path, previews)
+            except Exception as e:
+                Clock.schedule_once(lambda dt, error=e: self._on_failed(
+                    "Finding bursts", error))
+            else:
+                Clock.schedule_once(lambda dt: self._on_bursts_found(bursts))
+            finally:
+                self._burst_thread = None
+
+        self._burst_thread = threading.Thread(target=run, daemon=True)
+        self._burst_thread.start()
+
+    def _on_bursts_found(self, bursts):
+        self._picture_manager.bursts = bursts
+        self.on_source(self, self.source)
+
+    def _on_failed(self, task: str, error: Exception):
+        """Show why a background task failed until the next picture."""
+        self.picture_info = f"{task} failed: {error}"
+
+    def _score_pictures(self):
+        """Score the pictures in the background."""
+        if self._score_thread is not None:
+            return
+
+        previews = [picture.preview for picture in self._picture_manager]
+
+        def run():
+            try:
+                scores = score_pictures(self._path, previews)
+            except Exception as e:
+                Clock.schedule_once(lambda dt, error=e: self._on_failed(
+                    "Scoring", error))
+            else:
+                Clock.schedule_once(lambda dt: self._on_scores_found(scores))
+            finally:
+                self._score_thread = None
+
+        self._score_thread = threading.Thread(target=run, daemon=True)
+        self._score_thread.start()
+
+    def _on_scores_found(self, scores):
+        self._picture_manager.add_scores(scores)
+        self.on_source(self, self.source)
+
+    def _update_histogram(self):
+        """
+        Show the cached histogram of the current picture and compute the
+        missing ones of it and its neighbours in the background.
+        """
+        if not self.show_histogram:
+            return
+
+        current = self._current_picture
+        self.histogram = self._histograms.get(self._source_of(current))
+
+        neighbours = [self._picture_manager.peek(offset)
+                      for offset in (1, -1, 2, -2)]
+        self._histograms.request(
+            [current] + neighbours,
+            lambda picture, path, histogram: Clock.schedule_once(
+                lambda dt: self._on_histogram(picture, histogram)))
+
+    def _on_histogram(self, picture, histogram):
+        if picture == self._current_picture:
+            self.histogram = histogram
 
     def _on_key_down(self, keyboard, keycode, text, modifiers):
         key = keycode[1]
@@ -130,27 +282,83 @@ class PhlowViewer(Widget):
             elif key == 'k':
                 # offset up
                 self.img.offsetfactor_y -= .1
+            elif key == 'n':
+                # previous picture without action
+                self._current_picture = self._picture_manager.next_matching(
+                    "unrated", -1)
+                self._prefetcher.update(self._picture_manager, -1)
+            elif key == 'b':
+                # first picture of the previous burst
+                self._current_picture = self._picture_manager.previous_burst
+                self._prefetcher.update(self._picture_manager, -1)
+            elif key == 'x':
+                # cull the burst, keeping only the current picture
+                try:
+                    self._picture_manager.reject_burst()
+                except AttributeError:
+                    pass
+            elif key == 'y':
+                # reject all pictures which are likely blurry
+                try:
+                    self._picture_manager.reject_matching("blurry")
+                except AttributeError:
+                    pass
+            elif key == 'g':
+                # last picture
+                self._current_picture = self._picture_manager.jump(-1)
+                self._prefetcher.update(self._picture_manager, -1)
         else:
             if key == "l":
                 self._current_picture = self._picture_manager.next
+                self._prefetcher.update(self._picture_manager, 1)
             elif key == "h":
                 self._current_picture = self._picture_manager.previous
+                self._prefetcher.update(self._picture_manager, -1)
+            elif key == "n":
+                # next picture without action
+                self._current_picture = self._picture_manager.next_matching(
+                    "unrated")
+                self._prefetcher.update(self._picture_manager, 1)
+            elif key == "b":
+                # first picture of the next burst
+                self._current_picture = self._picture_manager.next_burst
+                self._prefetcher.update(self._picture_manager, 1)
+            elif key == "f":
+                self._find_bursts()
+            elif key == "s":
+                self._score_pictures()
+            elif key == "i":
+                self.show_histogram = not self.show_histogram
+                self._update_histogram()
+            elif key == "y":
+                # next picture which is likely blurry
+                self._current_picture = self._picture_manager.next_matching(
+                    "blurry")
+                self._prefetcher.update(self._picture_manager, 1)
+            elif key == "g":
+                # first picture
+                self._current_picture = self._picture_manager.jump(0)
+                self._prefetcher.update(self._picture_manager)
             elif key == "1":
                 self._picture_manager.mode = Mode.CATEGORIZING
                 self.mode = Mode.CATEGORIZING
                 self._current_picture = self._picture_manager.current_picture
+                self._prefetcher.update(self._picture_manager)
             elif key == "2":
                 self._picture_manager.mode = Mode.EDITING
                 self.mode = Mode.EDITING
                 self._current_picture = self._picture_manager.current_picture
+                self._prefetcher.update(self._picture_manager)
             elif key == "3":
                 self._picture_manager.mode = Mode.VIEW_ALL
                 self.mode = Mode.VIEW_ALL
                 self._current_picture = self._picture_manager.current_picture
+                self._prefetcher.update(self._picture_manager)
             elif key == "4":
                 self._picture_manager.mode = Mode.VIEW_PUBLIC
                 self.mode = Mode.VIEW_PUBLIC
                 self._current_picture = self._picture_manager.current_picture
+                self._prefetcher.update(self._picture_manager)
             elif key == "x":
                 self.action = "reject"
             elif key == "c":
@@ -165,32 +373,153 @@ class PhlowViewer(Widget):
                 self.img.zoomfactor = 1
                 self.img.offsetfactor_x = 0
                 self.img.offsetfactor_y = 0
+            elif key == 'z':
+                self._picture_manager.undo()
+                self._current_picture = self._picture_manager.current_picture
+                self._prefetcher.update(self._picture_manager)
             elif key == 'e':
                 if self.mode == Mode.EDITING:
                     # open in darktable
-                    path = os.path.join(self._path, 'src', 'arw',
-                                        f'{self._current_picture.name}.ARW')
-                    subprocess.Popen(['darktable', path])
+                    path = self._picture_manager.index.raw(
+                        self._current_picture.name)
+                    if path is not None:
+                        subprocess.Popen(['darktable', path])
 
     def on_source(self, obj, value):
-        print(self.source.split("/")[-1], self._current_picture.name)
-
         is_public = " - public" if self._current_picture.is_public else ""
-        self.picture_info = self._current_picture.name + is_public
-
-        print(getattr(self.img, 'angle', 0), "winkel")
+        position, length = self._picture_manager.burst_position
+        burst = f" - burst {position + 1}/{length}" if length > 1 else ""
+        score = self._current_picture.score
+        sharpness = f" - sharpness {score.sharpness:.0f}" if score else ""
+        self.picture_info = (self._current_picture.name + is_public + burst +
+                             sharpness)
+        self._update_histogram()
 
 
 class RotatableImage(Image):
-    def _get_angle(self):
-        return get_picture_angle(self.source)
+    """
+    Image decoding its source at the size of the widget.
+
+    Pictures are decoded upright, so rotated pictures need no special
+    handling, and uploaded into textures of a TexturePool, which are kept in
+    a TextureCache shared with the Prefetcher.
+    """
+    texture_cache = ObjectProperty(None, allownone=True)
 
-    angle = AliasProperty(_get_angle, None, bind=("source", ), cache=True)
+    # full resolution picture and loader of its tiles, shown when zoomed in
+    tile_source = StringProperty("")
+    tile_loader = ObjectProperty(None, allownone=True)
 
-    def get_is_rotated(self):
-        return self.angle == 90 or self.angle == 270
+    def __init__(self, **kwargs):
+        self._trigger_reload = Clock.create_trigger(self.texture_update)
+        self._trigger_tiles = Clock.create_trigger(self._update_tiles)
+        self._tiles = InstructionGroup()
+        self._tile_center = None
+        self._pan = (0, 0)
+        super().__init__(**kwargs)
+        # drawn over the texture, before the zoom is popped
+        self.canvas.after.insert(0, self._tiles)
+        self.fbind('size', self._trigger_reload)
+        for name in ('pos', 'size', 'texture', 'zoomfactor', 'tile_source'):
+            self.fbind(name, self._trigger_tiles)
+
+    def texture_update(self, *largs):
+        if not self.source or self.texture_cache is None:
+            self.texture = None
+            return
+
+        size = (max(1, int(self.width)), max(1, int(self.height)))
+        key = (self.source, size)
+        texture = self.texture_cache.get(key)
+        if texture is not None:
+            instrument.count("texture.cache_hits")
+            self.texture = texture
+            return
+
+        instrument.count("texture.cache_misses")
+        with instrument.span("texture_load", source=self.source):
+            try:
+                decoded = decode_picture(*key)
+            except OSError:
+                self.texture = None
+                return
+            texture = self.texture_cache.pool.upload(*decoded)
+        self.texture_cache.put(key, texture)
+        self.texture = texture
+
+    def _update_tiles(self, *largs):
+        """
+        Draw the tiles of the full resolution picture covering the visible
+        part of the zoomed image.
+
+        Tiles are decoded at the level closest to the zoom, the texture stays
+        visible underneath until they are loaded. The tiles next to the
+        visible ones in the direction of panning are loaded ahead.
+        """
+        self._tiles.clear()
+        loader = self.tile_loader
+        if (loader is None or not self.tile_source or self.texture is None
+                or self.zoomfactor <= 1 or self.parent is None):
+            if loader is not None:
+                loader.release()
+            self._tile_center = None
+            return
 
-    is_rotated = AliasProperty(get_is_rotated, bind=('angle', ), cache=True)
+        try:
+            size = loader.size(self.tile_source)
+        except OSError:
+            return
+
+        zoom = self.zoomfactor
+        image_w, image_h = self.norm_image_size
+        level = level_for(image_w * zoom / size[0])
+        width, height = level_size(size, level)
+        left = self.center_x - image_w / 2
+        top = self.center_y + image_h / 2
+        # pixels of the level per pixel of the image before zooming
+        scale = width / image_w
+
+        # the parent shows the image zoomed around the center of the widget
+        parent = self.parent
+        region = (
+            (self.center_x + (parent.x - self.center_x) / zoom - left) * scale,
+            (top - self.center_y - (parent.top - self.center_y) / zoom) * scale,
+            (self.center_x + (parent.right - self.center_x) / zoom - left) *
+            scale,
+            (top - self.center_y - (parent.y - self.center_y) / zoom) * scale,
+        )
+        columns, rows = visible_tiles((width, height), region)
+
+        # relative to the size, so changing the level is no panning
+        center = ((region[0] + region[2]) / 2 / width,
+                  (region[1] + region[3]) / 2 / height)
+        if self._tile_center is not None and center != self._tile_center:
+            self._pan = tuple((new > old) - (new < old)
+                              for new, old in zip(center, self._tile_center))
+        self._tile_center = center
+
+        visible = [(self.tile_source, level, column, row) for row in rows
+                   for column in columns]
+        prefetch = [(self.tile_source, level, column, row)
+                    for column, row in ahead(columns, rows, self._pan,
+                                             (width, height))]
+
+        self._tiles.add(Color(1, 1, 1, 1))
+        for key in visible:
+            texture = loader.cache.get(key)
+            if texture is None:
+                continue
+            x0, y0, x1, y1 = tile_box((width, height), key[2], key[3])
+            self._tiles.add(
+                Rectangle(texture=texture,
+                          pos=(left + x0 / scale, top - y1 / scale),
+                          size=((x1 - x0) / scale, (y1 - y0) / scale)))
+
+        loader.request(visible + prefetch, self._on_tile_loaded)
+
+    def _on_tile_loaded(self, key):
+        if key[0] == self.tile_source:
+            self._trigger_tiles()
 
     zoomfactor = NumericProperty(1)
     offsetfactor_x = BoundedNumericProperty(0,
@@ -205,30 +534,16 @@ class RotatableImage(Image):
                                                           if x > 1 else -1))
 
     def _get_offset_x(self):
-        print("getoffset x")
-        if self.is_rotated:
-            window_w, window_h = self.parent.size
-            self_h, self_w = self.norm_image_size
-        else:
-            window_w, window_h = self.parent.size
-            self_w, self_h = self.norm_image_size
-        self_w *= self.scale_factor
-        print(f"offset x: {(self_w - window_w) / 2}")
+        window_w = self.parent.width
+        self_w = self.norm_image_size[0] * self.zoomfactor
         if (self_w - window_w) / 2 > 0:
             return ((self_w - window_w) / 2) * self.offsetfactor_x
         else:
             return 0
 
     def _get_offset_y(self):
-        print("getoffset y")
-        if self.is_rotated:
-            window_w, window_h = self.parent.size
-            self_h, self_w = self.norm_image_size
-        else:
-            window_w, window_h = self.parent.size
-            self_w, self_h = self.norm_image_size
-        self_h *= self.scale_factor
-        print(f"offset y: {(self_h - window_h) / 2}")
+        window_h = self.parent.height
+        self_h = self.norm_image_size[1] * self.zoomfactor
         if (self_h - window_h) / 2 > 0:
             return ((self_h - window_h) / 2) * self.offsetfactor_y
         else:
@@ -236,31 +551,9 @@ class RotatableImage(Image):
 
     offset_x = AliasProperty(_get_offset_x,
                              None,
-                             bind=('offsetfactor_x', 'scale_factor'),
+                             bind=('offsetfactor_x', 'zoomfactor', 'texture'),
                              cache=True)
     offset_y = AliasProperty(_get_offset_y,
                              None,
-                             bind=('offsetfactor_y', 'scale_factor'),
+                             bind=('offsetfactor_y', 'zoomfactor', 'texture'),
                              cache=True)
-
-    def get_scale(self):
-        scale = 1.
-        if self.is_rotated:
-            iw, ih = self.norm_image_size
-            w, h = self.size
-            if ih == h:
-                scale = ih / iw
-            elif iw == w:
-                scale = h / w
-            else:
-                # TODO make right for pictures smaller than the window
-                # raise ValueError(f"You didn't think of {w} {iw} {h} {ih}")
-                pass
-            # print(f"Here it's {w} {iw} {h} {ih}")
-            if w < ih * scale:
-                scale = w / ih
-        return scale * self.zoomfactor
-
-    scale_factor = AliasProperty(get_scale,
-                                 bind=('texture', 'size', 'zoomfactor'),
-                                 cache=True)
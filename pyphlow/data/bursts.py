@@ -0,0 +1,110 @@
+from pyphlow.data import features
+from pyphlow.data.catalog import Catalog
+from pyphlow.data.exif import read_capture_time
+
+FEATURE = "burst"
+
+# side of the grid of compared pixels, the hashes of 64 bits are handled as
+# unsigned 64 bit integers
+HASH_SIZE = 8
+
+# differing bits up to which two consecutive pictures look the same
+MAX_DISTANCE = 10
+# maximum seconds between two consecutive pictures of a burst
+MAX_GAP = 2.
+
+
+def dhash(path: str, size: int = HASH_SIZE) -> int:
+    """
+    Compute the difference hash of a picture.
+
+    The picture is decoded at a fraction of its size, shrunk to a grid of
+    size + 1 by size grey values, and every bit of the hash tells whether a
+    pixel is brighter than its left neighbour.
+    """
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as image:
+        # let the JPEG decoder scale down, a full decode is not needed
+        image.draft('L', (size * 8, size * 8))
+        grey = image.convert('L').resize((size + 1, size), Image.BILINEAR)
+        pixels = np.asarray(grey, dtype=np.int16)
+
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def picture_features(path: str):
+    """
+    Returns:
+        list: difference hash and capture time of a picture, or None if it
+            can not be read
+    """
+    try:
+        return [dhash(path), read_capture_time(path)]
+    except OSError:
+        return None
+
+
+def group_bursts(paths: list,
+                 features: dict,
+                 max_distance: int = MAX_DISTANCE,
+                 max_gap: float = MAX_GAP) -> dict:
+    """
+    Group consecutive pictures which look alike and were taken shortly after
+    each other.
+
+    Args:
+        paths: paths of the pictures in the order they are viewed
+        features: paths mapped to hash and capture time
+        max_distance: differing bits up to which pictures look alike
+        max_gap: seconds up to which pictures belong to the same burst,
+            pictures without capture time are only compared by their hash
+
+    Returns:
+        dict: paths mapped to the number of their group, counting from 0
+    """
+    import numpy as np
+
+    if not paths:
+        return {}
+
+    known = np.array([path in features for path in paths])
+    hashes = np.array([features[path][0] if path in features else 0
+                       for path in paths], dtype=np.uint64)
+    times = np.array([(features[path][1] or np.nan) if path in features
+                      else np.nan for path in paths])
+
+    # Hamming distances of all consecutive pictures at once
+    distances = np.unpackbits(
+        (hashes[1:] ^ hashes[:-1]).view(np.uint8)).reshape(-1, 64).sum(axis=1)
+    gaps = np.abs(times[1:] - times[:-1])
+
+    # NaN gaps of pictures without capture time compare as False
+    joined = (distances <= max_distance) & ~(gaps > max_gap) \
+        & known[1:] & known[:-1]
+    groups = np.concatenate(([0], np.cumsum(~joined)))
+
+    return dict(zip(paths, groups.tolist()))
+
+
+def find_bursts(root: str, paths: list, workers: int = None, **kwargs) -> dict:
+    """
+    Group the pictures of a shoot into bursts.
+
+    Args:
+        root: root of the shoot
+        paths: paths of the pictures in the order they are viewed
+        workers: number of processes computing hashes
+        kwargs: passed to group_bursts()
+
+    Returns:
+        dict: paths mapped to the number of their group
+    """
+    paths = [path for path in paths if path]
+    with Catalog(root) as catalog:
+        values = features.compute(FEATURE, picture_features, paths, catalog,
+                                  workers)
+
+    return group_bursts(paths, values, **kwargs)
@@ -0,0 +1,270 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+CATALOG_DIR = ".pyphlow"
+CATALOG_NAME = "catalog.sqlite"
+
+# directories modified this recently may still change within the resolution
+# of their mtime, so their listing is not trusted on the next scan
+_RACY_WINDOW = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    mtime INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    PRIMARY KEY (directory, name)
+);
+CREATE TABLE IF NOT EXISTS pictures (
+    mode TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    preview TEXT NOT NULL,
+    is_public INTEGER NOT NULL,
+    PRIMARY KEY (mode, position)
+);
+CREATE TABLE IF NOT EXISTS dependencies (
+    mode TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    PRIMARY KEY (mode, directory)
+);
+CREATE TABLE IF NOT EXISTS features (
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (path, kind)
+);
+"""
+
+
+class Catalog:
+    """
+    Persistent record of the directory tree of a shoot.
+
+    Directory listings and the picture lists of every mode are stored in an
+    SQLite database inside the shoot root, together with the modification
+    times of the directories they were read from. A directory is only read
+    again after its modification time has changed.
+
+    All paths are stored relative to the root, so the catalog stays valid when
+    the shoot is moved.
+    """
+
+    def __init__(self, root: str, path: str = None):
+        self.root = os.path.abspath(root)
+
+        if path is None:
+            path = os.path.join(self.root, CATALOG_DIR, CATALOG_NAME)
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+        except (OSError, sqlite3.Error):
+            # read-only shoots still work, they are just not cached
+            self._db = sqlite3.connect(":memory:", check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+
+        self._visited = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def _absolute(self, path: str) -> str:
+        return os.path.normpath(os.path.join(self.root, path))
+
+    def scandir(self, path: str) -> list:
+        """
+        List a directory.
+
+        The listing is served from the catalog if the directory has not been
+        modified since it was last read.
+
+        Args:
+            path: directory to list
+
+        Returns:
+            list: tuples of entry name and whether the entry is a directory
+        """
+        mtime = os.stat(path).st_mtime_ns
+        key = self._relative(path)
+
+        if self._visited is not None:
+            self._visited[key] = mtime
+
+        row = self._db.execute("SELECT mtime FROM directories WHERE path = ?",
+                               (key, )).fetchone()
+        if row is not None and row[0] == mtime:
+            return self._db.execute(
+                "SELECT name, is_dir FROM entries WHERE directory = ? "
+                "ORDER BY name", (key, )).fetchall()
+
+        with os.scandir(path) as it:
+            entries = sorted((entry.name, entry.is_dir()) for entry in it)
+
+        with self._db:
+            self._db.execute("DELETE FROM entries WHERE directory = ?",
+                             (key, ))
+            self._db.executemany(
+                "INSERT INTO entries (directory, name, is_dir) "
+                "VALUES (?, ?, ?)",
+                ((key, name, is_dir) for name, is_dir in entries))
+            self._db.execute(
+                "INSERT OR REPLACE INTO directories (path, mtime) "
+                "VALUES (?, ?)", (key, _trusted_mtime(mtime)))
+
+        return entries
+
+    def listdir(self, path: str) -> list:
+        """Cached equivalent of os.listdir."""
+        return [name for name, _ in self.scandir(path)]
+
+    def walk(self, path: str):
+        """Cached equivalent of os.walk."""
+        entries = self.scandir(path)
+        dirs = [name for name, is_dir in entries if is_dir]
+        files = [name for name, is_dir in entries if not is_dir]
+
+        yield path, dirs, files
+
+        for directory in dirs:
+            yield from self.walk(os.path.join(path, directory))
+
+    @contextmanager
+    def record(self):
+        """
+        Record every directory listed within the context.
+
+        Yields:
+            dict: relative directory paths mapped to their mtime
+        """
+        previous = self._visited
+        self._visited = {}
+        try:
+            yield self._visited
+        finally:
+            visited = self._visited
+            self._visited = previous
+            if previous is not None:
+                previous.update(visited)
+
+    def load(self, mode: str):
+        """
+        Load the picture list of a mode.
+
+        Args:
+            mode: name of the mode
+
+        Returns:
+            iterator: tuples of name, preview path and public status in the
+                stored order, read as they are consumed, or None if the stored
+                list is missing or outdated
+        """
+        dependencies = self._db.execute(
+            "SELECT directory, mtime FROM dependencies WHERE mode = ?",
+            (mode, )).fetchall()
+        if not dependencies:
+            return None
+
+        for directory, mtime in dependencies:
+            try:
+                if os.stat(self._absolute(directory)).st_mtime_ns != mtime:
+                    return None
+            except FileNotFoundError:
+                return None
+
+        return ((name, self._absolute(preview) if preview else "",
+                 bool(is_public)) for name, preview, is_public in
+                self._db.execute(
+                    "SELECT name, preview, is_public FROM pictures "
+                    "WHERE mode = ? ORDER BY position", (mode, )))
+
+    def store(self, mode: str, pictures, dependencies: dict):
+        """
+        Store the picture list of a mode.
+
+        Args:
+            mode: name of the mode
+            pictures: tuples of name, preview path and public status
+            dependencies: directories the list was built from, as yielded by
+                record()
+        """
+        with self._db:
+            self._db.execute("DELETE FROM pictures WHERE mode = ?", (mode, ))
+            self._db.execute("DELETE FROM dependencies WHERE mode = ?",
+                             (mode, ))
+            self._db.executemany(
+                "INSERT INTO pictures (mode, position, name, preview, "
+                "is_public) VALUES (?, ?, ?, ?, ?)",
+                ((mode, position, name,
+                  self._relative(preview) if preview else "", is_public)
+                 for position, (name, preview,
+                                is_public) in enumerate(pictures)))
+            self._db.executemany(
+                "INSERT INTO dependencies (mode, directory, mtime) "
+                "VALUES (?, ?, ?)",
+                ((mode, directory, _trusted_mtime(mtime))
+                 for directory, mtime in dependencies.items()))
+
+    def load_features(self, kind: str, paths: dict) -> dict:
+        """
+        Load values computed from files, e.g. perceptual hashes.
+
+        Args:
+            kind: name of the feature
+            paths: paths of the files mapped to their current mtime
+
+        Returns:
+            dict: paths mapped to the stored values, values computed from an
+                older version of a file are left out
+        """
+        relative = {self._relative(path): path for path in paths}
+        features = {}
+        for path, mtime, value in self._db.execute(
+                "SELECT path, mtime, value FROM features WHERE kind = ?",
+                (kind, )):
+            absolute = relative.get(path)
+            if absolute is not None and paths[absolute] == mtime:
+                features[absolute] = json.loads(value)
+
+        return features
+
+    def store_features(self, kind: str, features):
+        """
+        Store values computed from files.
+
+        Args:
+            kind: name of the feature
+            features: tuples of path, mtime of the file and a value which can
+                be encoded as JSON
+        """
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO features (path, kind, mtime, value) "
+                "VALUES (?, ?, ?, ?)",
+                ((self._relative(path), kind, _trusted_mtime(mtime),
+                  json.dumps(value)) for path, mtime, value in features))
+
+
+def _trusted_mtime(mtime: int) -> int:
+    if time.time_ns() - mtime < _RACY_WINDOW * 10**9:
+        return -1
+    return mtime
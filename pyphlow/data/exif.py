@@ -0,0 +1,228 @@
+import calendar
+import struct
+import time
+
+ORIENTATION = 0x0112
+EXIF_IFD = 0x8769
+DATETIME_ORIGINAL = 0x9003
+SUBSEC_TIME_ORIGINAL = 0x9291
+
+# bytes read to find the orientation, retried with the maximum size of an
+# APP1 segment if the IFD lies further into the file
+_HEAD_SIZE = 8 * 1024
+_APP1_SIZE = 64 * 1024
+
+# sizes of the TIFF field types
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8,
+               11: 4, 12: 8, 13: 4}
+_TYPE_FORMATS = {1: 'B', 3: 'H', 4: 'I', 6: 'b', 8: 'h', 9: 'i', 13: 'I'}
+
+
+class TiffReader:
+    """
+    Minimal reader for the image file directories of TIFF structured data.
+
+    Used for the EXIF data of JPEG files as well as for TIFF based raw files.
+    Reading beyond the end of the data raises struct.error.
+    """
+
+    def __init__(self, data: bytes, start: int = 0):
+        """
+        Args:
+            data: bytes containing the TIFF structure
+            start: offset of the TIFF header within data
+        """
+        order = data[start:start + 2]
+        if order == b'II':
+            self._endian = '<'
+        elif order == b'MM':
+            self._endian = '>'
+        else:
+            raise ValueError("No TIFF header")
+
+        self.data = data
+        self.start = start
+        self.first_ifd = self._unpack('I', 4)
+
+    def _unpack(self, fmt: str, offset: int):
+        return struct.unpack_from(self._endian + fmt, self.data,
+                                  self.start + offset)[0]
+
+    def ifd(self, offset: int):
+        """
+        Read an image file directory.
+
+        Args:
+            offset: offset of the directory relative to the TIFF header
+
+        Returns:
+            tuple: dict mapping tags to their values and the offset of the
+                next directory, which is 0 for the last one. Values which lie
+                beyond the data are None
+        """
+        count = self._unpack('H', offset)
+        entries = {}
+        for i in range(count):
+            entry = offset + 2 + 12 * i
+            tag = self._unpack('H', entry)
+            try:
+                entries[tag] = self._values(entry)
+            except struct.error:
+                # value stored beyond the data read
+                entries[tag] = None
+
+        return entries, self._unpack('I', offset + 2 + 12 * count)
+
+    def _values(self, entry: int):
+        field_type = self._unpack('H', entry + 2)
+        count = self._unpack('I', entry + 4)
+
+        size = _TYPE_SIZES.get(field_type, 1) * count
+        offset = entry + 8 if size <= 4 else self._unpack('I', entry + 8)
+
+        if field_type in (2, 7):
+            start = self.start + offset
+            if start + size > len(self.data):
+                raise struct.error("Value beyond end of data")
+            return self.data[start:start + size]
+
+        fmt = _TYPE_FORMATS.get(field_type)
+        if fmt is None:
+            return None
+        return struct.unpack_from(f"{self._endian}{count}{fmt}", self.data,
+                                  self.start + offset)
+
+
+def find_tiff(data: bytes):
+    """
+    Locate the TIFF structure of a JPEG or TIFF file.
+
+    Args:
+        data: first bytes of the file
+
+    Returns:
+        int: offset of the TIFF header, or None if there is none
+    """
+    if data[:4] in (b'II*\0', b'MM\0*'):
+        return 0
+
+    if data[:2] != b'\xff\xd8':
+        return None
+
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # fill byte
+            pos += 1
+            continue
+        if marker in (0xDA, 0xD9):
+            # start of scan or end of image, no more metadata
+            return None
+
+        length = struct.unpack_from('>H', data, pos + 2)[0]
+        if marker == 0xE1 and data[pos + 4:pos + 10] == b'Exif\0\0':
+            return pos + 10
+        pos += 2 + length
+
+    return None
+
+
+def parse_orientation(data: bytes) -> int:
+    """
+    Extract the orientation from the first bytes of a file.
+
+    Returns:
+        int: EXIF orientation from 1 to 8, 0 if the file has none, or None if
+            more data is needed
+    """
+    start = find_tiff(data)
+    if start is None:
+        # the segment list may continue beyond the data read so far
+        return None if len(data) >= _HEAD_SIZE else 0
+
+    try:
+        reader = TiffReader(data, start)
+        entries, _ = reader.ifd(reader.first_ifd)
+    except struct.error:
+        return None
+    except ValueError:
+        return 0
+
+    orientation = entries.get(ORIENTATION)
+    return orientation[0] if orientation else 0
+
+
+def read_orientation(path: str) -> int:
+    """Return the EXIF orientation of a picture, or 0 if it has none."""
+    with open(path, 'rb') as f:
+        data = f.read(_HEAD_SIZE)
+        orientation = parse_orientation(data)
+        if orientation is None:
+            data += f.read(_APP1_SIZE)
+            orientation = parse_orientation(data) or 0
+
+    return orientation
+
+
+def parse_capture_time(data: bytes):
+    """
+    Extract the time a picture was taken from the first bytes of a file.
+
+    The time is the local time of the camera, so only differences between
+    pictures of the same camera are meaningful.
+
+    Returns:
+        float: seconds since the epoch, 0 if the file has no capture time, or
+            None if more data is needed
+    """
+    start = find_tiff(data)
+    if start is None:
+        return None if len(data) >= _HEAD_SIZE else 0.
+
+    try:
+        reader = TiffReader(data, start)
+        entries, _ = reader.ifd(reader.first_ifd)
+        exif = entries.get(EXIF_IFD)
+        if not exif:
+            return None if EXIF_IFD in entries else 0.
+        entries, _ = reader.ifd(exif[0])
+    except struct.error:
+        return None
+    except ValueError:
+        return 0.
+
+    if DATETIME_ORIGINAL not in entries:
+        return 0.
+    value = entries[DATETIME_ORIGINAL]
+    if value is None:
+        return None
+
+    try:
+        seconds = calendar.timegm(
+            time.strptime(value.rstrip(b'\0 ').decode('ascii'),
+                          "%Y:%m:%d %H:%M:%S"))
+    except (UnicodeDecodeError, ValueError):
+        return 0.
+
+    subsec = entries.get(SUBSEC_TIME_ORIGINAL)
+    if subsec:
+        digits = subsec.rstrip(b'\0 ')
+        if digits.isdigit():
+            seconds += int(digits) / 10**len(digits)
+
+    return float(seconds)
+
+
+def read_capture_time(path: str) -> float:
+    """Return the capture time of a picture, or 0 if it has none."""
+    with open(path, 'rb') as f:
+        data = f.read(_HEAD_SIZE)
+        capture_time = parse_capture_time(data)
+        if capture_time is None:
+            data += f.read(_APP1_SIZE)
+            capture_time = parse_capture_time(data) or 0.
+
+    return capture_time
@@ -0,0 +1,58 @@
+import os
+
+from pyphlow import instrument
+from pyphlow.data.catalog import Catalog
+
+
+def compute(kind: str,
+            function,
+            paths,
+            catalog: Catalog,
+            workers: int = None) -> dict:
+    """
+    Compute a value from each of many files in parallel.
+
+    Values are cached in the catalog per path and mtime, only files which
+    are new or changed are read.
+
+    Args:
+        kind: name the values are cached under
+        function: function of a path, returning a value which can be encoded
+            as JSON or None if the file can not be read. It is run in other
+            processes, so it has to be defined at module level
+        paths: paths of the files
+        catalog: catalog of the shoot
+        workers: number of processes, defaults to the number of CPUs
+
+    Returns:
+        dict: paths mapped to their values, files which can not be read are
+            left out
+    """
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            pass
+
+    values = catalog.load_features(kind, mtimes)
+    jobs = sorted(path for path in mtimes if path not in values)
+    instrument.count(f"{kind}.cached", len(values))
+    instrument.count(f"{kind}.computed", len(jobs))
+
+    if jobs:
+        # multiprocessing is slow to import and only needed here
+        from concurrent.futures import ProcessPoolExecutor
+
+        with instrument.span(kind, files=len(jobs)), \
+                ProcessPoolExecutor(max_workers=workers) as executor:
+            computed = list(
+                executor.map(function, jobs,
+                             chunksize=max(1, len(jobs) // 256)))
+
+        computed = [(path, mtimes[path], value)
+                    for path, value in zip(jobs, computed) if value is not None]
+        catalog.store_features(kind, computed)
+        values.update((path, value) for path, _, value in computed)
+
+    return values
@@ -0,0 +1,156 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from pyphlow import instrument
+
+# longest edge of the picture the histogram is computed on
+HISTOGRAM_SIZE = 512
+
+BINS = 256
+
+# values up to which a pixel counts as black and from which as white
+SHADOW_LEVEL = 2
+HIGHLIGHT_LEVEL = 253
+
+# share of clipped pixels from which clipping is worth pointing out
+CLIP_WARNING = .005
+
+
+class Histogram(NamedTuple):
+    """Distribution of the values of a picture."""
+    # share of the pixels for every value of a channel, from 0 to 255
+    red: list
+    green: list
+    blue: list
+    luma: list
+    # share of pixels which are black in all channels
+    shadows: float
+    # share of pixels which are white in any channel
+    highlights: float
+
+
+def compute_histogram(path: str, size: int = HISTOGRAM_SIZE) -> Histogram:
+    """
+    Compute the histogram of a picture.
+
+    The picture is decoded at a fraction of its size, all channels are
+    counted on the whole array at once.
+
+    Raises:
+        OSError: if the picture can not be read
+    """
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image.draft('RGB', (size, size))
+        picture = image.convert('RGB')
+        picture.thumbnail((size, size))
+        pixels = np.asarray(picture).reshape(-1, 3)
+
+    # Rec. 601 weights, as used by PIL for grey values
+    luma = (pixels @ np.array([299, 587, 114])) // 1000
+    total = max(1, len(pixels))
+    counts = [np.bincount(pixels[:, channel], minlength=BINS)
+              for channel in range(3)]
+    counts.append(np.bincount(luma, minlength=BINS))
+
+    return Histogram(
+        *((count / total).tolist() for count in counts),
+        float(np.mean(pixels.max(axis=1) <= SHADOW_LEVEL)),
+        float(np.mean(pixels.max(axis=1) >= HIGHLIGHT_LEVEL)),
+    )
+
+
+class HistogramCache:
+    """
+    Histograms of pictures, computed in background threads.
+
+    Histograms are cached per path together with the mtime of the picture
+    they were computed from, so changed pictures are computed again.
+    """
+
+    def __init__(self, source, max_entries: int = 512, workers: int = 1):
+        """
+        Args:
+            source: function returning the path to compute the histogram of
+                for a picture, called from the worker threads
+            max_entries: number of cached histograms
+            workers: number of computing threads
+        """
+        self.max_entries = max_entries
+        self._source = source
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = {}
+
+        self._histograms = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str):
+        """
+        Returns:
+            Histogram: the cached histogram of a picture if it is still
+                current, else None
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._histograms.get(path)
+            if cached is None or cached[0] != mtime:
+                return None
+            self._histograms.move_to_end(path)
+            return cached[1]
+
+    def _put(self, path: str, mtime: int, histogram: Histogram):
+        with self._lock:
+            self._histograms[path] = (mtime, histogram)
+            self._histograms.move_to_end(path)
+            while len(self._histograms) > self.max_entries:
+                self._histograms.popitem(last=False)
+
+    def request(self, pictures, callback):
+        """
+        Compute the histograms of pictures which are not cached yet.
+
+        Pending pictures which are no longer requested are cancelled. Must
+        always be called from the same thread.
+
+        Args:
+            pictures: pictures, the most urgent first
+            callback: function called with the picture, its path and its
+                Histogram from a worker thread for every computed histogram
+        """
+        pictures = list(dict.fromkeys(pictures))
+        for picture, future in list(self._pending.items()):
+            if future.done() or (picture not in pictures and future.cancel()):
+                del self._pending[picture]
+
+        for picture in pictures:
+            if picture not in self._pending:
+                self._pending[picture] = self._executor.submit(
+                    self._compute, picture, callback)
+
+    def shutdown(self):
+        for picture, future in list(self._pending.items()):
+            if future.cancel():
+                del self._pending[picture]
+        self._executor.shutdown(wait=False)
+
+    def _compute(self, picture, callback):
+        path = self._source(picture)
+        histogram = self.get(path)
+        if histogram is None:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                with instrument.span("histogram", path=path):
+                    histogram = compute_histogram(path)
+            except OSError:
+                return
+            self._put(path, mtime, histogram)
+        callback(picture, path, histogram)
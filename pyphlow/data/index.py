@@ -0,0 +1,128 @@
+import os
+
+JPG_EXTENSIONS = ("jpg", "JPG", "jpeg", "JPEG")
+RAW_EXTENSIONS = ("ARW", "arw", "NEF", "nef", "CR2", "cr2", "CR3", "cr3",
+                  "DNG", "dng", "RAF", "raf", "ORF", "orf", "RW2", "rw2")
+SIDECAR_EXTENSIONS = ("xmp", "XMP")
+
+
+def _scandir(path):
+    with os.scandir(path) as it:
+        return [(entry.name, entry.is_dir()) for entry in it]
+
+
+def split_name(file_name: str):
+    """Split a file name into picture name and extension, e.g. ARW.xmp"""
+    name, _, ext = file_name.partition('.')
+    return name, ext
+
+
+class ShootIndex:
+    """
+    Map picture names to all files belonging to them.
+
+    The index is built with a single pass over a directory tree, afterwards
+    files are resolved without touching the file system.
+    """
+
+    def __init__(self):
+        self._files = {}
+
+    @classmethod
+    def scan(cls, path: str, scandir=None, recursive: bool = True):
+        """
+        Index a directory.
+
+        Args:
+            path: directory to index
+            scandir: function listing a directory as tuples of entry name and
+                whether it is a directory, defaults to os.scandir
+            recursive: also index subdirectories
+
+        Returns:
+            ShootIndex: index of all files in the directory
+        """
+        if scandir is None:
+            scandir = _scandir
+
+        index = cls()
+        directories = [os.path.normpath(path)]
+
+        while directories:
+            directory = directories.pop()
+            for name, is_dir in scandir(directory):
+                if is_dir:
+                    if recursive:
+                        directories.append(os.path.join(directory, name))
+                else:
+                    index.add(os.path.join(directory, name))
+
+        return index
+
+    def add(self, path: str):
+        path = os.path.normpath(path)
+        name, ext = split_name(os.path.basename(path))
+        files = self._files.setdefault(name, [])
+        if path not in files:
+            files.append(path)
+
+    def discard(self, path: str):
+        path = os.path.normpath(path)
+        name, ext = split_name(os.path.basename(path))
+        files = self._files.get(name, [])
+        if path in files:
+            files.remove(path)
+            if not files:
+                del self._files[name]
+
+    def __contains__(self, name):
+        return name in self._files
+
+    def names(self) -> set:
+        """Names of all pictures with at least one file besides sidecars."""
+        return {
+            name
+            for name, files in self._files.items() if any(
+                not path.endswith(SIDECAR_EXTENSIONS) for path in files)
+        }
+
+    def files(self, name: str) -> list:
+        """All files of a picture, including sidecars."""
+        return list(self._files.get(name, ()))
+
+    def find(self, name: str, extensions, directory: str = None):
+        """
+        Find the file of a picture with the first matching extension.
+
+        Args:
+            name: name of the picture
+            extensions: accepted extensions in order of preference
+            directory: only accept files directly inside this directory
+
+        Returns:
+            str: path of the file or None
+        """
+        files = self._files.get(name, ())
+        if directory is not None:
+            directory = os.path.normpath(directory)
+            files = [path for path in files
+                     if os.path.dirname(path) == directory]
+
+        for extension in extensions:
+            for path in files:
+                if split_name(os.path.basename(path))[1] == extension:
+                    return path
+
+        return None
+
+    def jpg(self, name: str, directory: str = None):
+        return self.find(name, JPG_EXTENSIONS, directory)
+
+    def raw(self, name: str, directory: str = None):
+        return self.find(name, RAW_EXTENSIONS, directory)
+
+    def sidecars(self, name: str) -> list:
+        return [
+            path for path in self._files.get(name, ())
+            if path.endswith(SIDECAR_EXTENSIONS)
+        ]
@@ -0,0 +1,164 @@
+import errno
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pyphlow import instrument
+from pyphlow.data.catalog import CATALOG_DIR
+
+JOURNAL_DIR = "journal"
+
+_PENDING = ".pending"
+_DONE = ".done"
+
+# finished batches kept, older ones can not be undone any more
+UNDO_LEVELS = 16
+
+
+def move_file(old_path: str, new_path: str):
+    """Move a file, copying it if it has to cross a device boundary."""
+    try:
+        os.rename(old_path, new_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.copy2(old_path, new_path)
+        os.unlink(old_path)
+
+
+class Journal:
+    """
+    Crash safe record of the file moves done on a shoot.
+
+    Every batch of moves is written to the journal before it is executed and
+    marked as done afterwards. Batches that were interrupted can be completed
+    with recover() and the last finished batches can be reverted one by one
+    with undo(). Only the last UNDO_LEVELS finished batches are kept.
+    """
+
+    def __init__(self, root: str, workers: int = 8):
+        self.root = os.path.abspath(root)
+        self.directory = os.path.join(self.root, CATALOG_DIR, JOURNAL_DIR)
+        self.workers = workers
+
+    def _entries(self, suffix: str) -> list:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            os.path.join(self.directory, name) for name in names
+            if name.endswith(suffix))
+
+    def _read(self, path: str) -> list:
+        with open(path, 'r') as f:
+            return [(os.path.join(self.root, old), os.path.join(self.root, new))
+                    for old, new in json.load(f)]
+
+    def _write(self, path: str, moves):
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump([(os.path.relpath(old, self.root),
+                        os.path.relpath(new, self.root))
+                       for old, new in moves], f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _execute(self, moves, progress=None) -> list:
+        # create the directories up front, so the workers do not race
+        for directory in {os.path.dirname(new) for _, new in moves}:
+            os.makedirs(directory, exist_ok=True)
+
+        def move(paths):
+            old, new = paths
+            if os.path.exists(old):
+                move_file(old, new)
+            return paths
+
+        done = []
+        with instrument.span("moves", files=len(moves)), \
+                ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for paths in executor.map(move, moves):
+                done.append(paths)
+                if progress is not None:
+                    progress(len(done), len(moves))
+
+        instrument.count("moves.files", len(done))
+        return done
+
+    def run(self, moves, progress=None) -> list:
+        """
+        Execute a batch of moves.
+
+        Args:
+            moves: tuples of old and new path
+            progress: function called with the number of finished and total
+                moves after every move
+
+        Returns:
+            list: the executed moves
+        """
+        moves = list(moves)
+        if not moves:
+            return moves
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{time.time_ns()}")
+
+        self._write(path + _PENDING, moves)
+        self._execute(moves, progress)
+        os.replace(path + _PENDING, path + _DONE)
+        self._prune()
+
+        return moves
+
+    def _prune(self):
+        for path in self._entries(_DONE)[:-UNDO_LEVELS]:
+            os.unlink(path)
+
+    def pending(self) -> list:
+        """Return the moves of all interrupted batches."""
+        return [move for path in self._entries(_PENDING)
+                for move in self._read(path)]
+
+    def recover(self, progress=None) -> list:
+        """
+        Complete all interrupted batches.
+
+        Returns:
+            list: the moves of the completed batches
+        """
+        recovered = []
+        for path in self._entries(_PENDING):
+            moves = self._read(path)
+            self._execute(moves, progress)
+            os.replace(path, path[:-len(_PENDING)] + _DONE)
+            recovered.extend(moves)
+
+        if recovered:
+            self._prune()
+        return recovered
+
+    def undo(self, progress=None) -> list:
+        """
+        Revert the last finished batch.
+
+        Returns:
+            list: the reverted moves as tuples of old and new path
+        """
+        done = self._entries(_DONE)
+        if not done:
+            return []
+
+        path = done[-1]
+        moves = [(new, old) for old, new in self._read(path)]
+
+        self._write(path[:-len(_DONE)] + _PENDING, moves)
+        os.unlink(path)
+        self._execute(moves, progress)
+        os.unlink(path[:-len(_DONE)] + _PENDING)
+
+        return moves
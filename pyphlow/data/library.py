@@ -0,0 +1,316 @@
+import heapq
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from pyphlow import instrument
+from pyphlow.data.catalog import Catalog
+from pyphlow.data.index import ShootIndex
+from pyphlow.data.journal import Journal
+from pyphlow.data.picture import Mode, Picture, PictureTable
+from pyphlow.data.picturehandling import (NO_PICTURE, apply_actions,
+                                          can_apply, stream_pictures)
+
+
+def _open(root: str, mode: Mode):
+    """
+    Open the catalog of a shoot and start reading its pictures.
+
+    Returns:
+        tuple: the catalog and an iterator of tuples of name, preview path and
+            whether the picture is public, sorted by name
+    """
+    # complete moves that were interrupted last time
+    Journal(root).recover()
+    catalog = Catalog(root)
+    try:
+        with instrument.span("library_open", root=root):
+            pictures = catalog.load(mode.name)
+            if pictures is None:
+                # a fresh scan finds the pictures unsorted, so the whole shoot
+                # is scanned before its first picture can be merged
+                pictures = iter(
+                    sorted(stream_pictures(root, mode, catalog),
+                           key=lambda picture: picture[0]))
+    except BaseException:
+        catalog.close()
+        raise
+
+    return catalog, pictures
+
+
+class _Shoot:
+    """
+    Pictures of one shoot of a library, read from its catalog as they are
+    needed.
+    """
+
+    def __init__(self, root: str, mode: Mode, opened):
+        """
+        Args:
+            root: root of the shoot
+            mode: mode the pictures are loaded in
+            opened: future of the result of _open()
+        """
+        self.root = root
+        self.error = None
+
+        # pictures read so far, in name order
+        self.pictures = []
+        self._table = PictureTable(mode)
+        self._opened = opened
+        self._catalog = None
+        self._source = None
+
+    def _read(self) -> bool:
+        """Read the next picture, return whether there was one."""
+        try:
+            if self._source is None:
+                self._catalog, self._source = self._opened.result()
+
+            # the stored list is read lazily, so reading may fail as well
+            for name, preview, is_public in self._source:
+                self.pictures.append(
+                    Picture.view(self._table,
+                                 self._table.append(name, preview, is_public)))
+                return True
+        except (OSError, sqlite3.Error) as e:
+            self.error = e
+            self._source = iter(())
+        return False
+
+    def __iter__(self):
+        # reads by index, so several iterators can share the pictures read
+        index = 0
+        while index < len(self.pictures) or self._read():
+            yield self.root, self.pictures[index]
+            index += 1
+
+    def read_all(self):
+        while self._read():
+            pass
+
+    def close(self):
+        if self._catalog is not None:
+            self._catalog.close()
+        elif (self._opened.done() and not self._opened.cancelled()
+              and self._opened.exception() is None):
+            self._opened.result()[0].close()
+
+
+def _by_name(entry) -> str:
+    return entry[1].name
+
+
+class Library:
+    """
+    Pictures of many shoots browsed as one, sorted by name.
+
+    The catalogs of the shoots are opened concurrently in the background.
+    Their stored picture lists are read lazily and merged while browsing, so
+    browsing does not scan the shoots up front and no list of all pictures is
+    built. Only the pictures up to the furthest one browsed are kept. Shoots
+    whose stored list is missing or outdated have to be scanned completely
+    before their first picture can be merged, since a scan does not find the
+    pictures in order. Pictures with the same name keep the order of their
+    roots.
+
+    Actions are applied to the shoot each picture belongs to.
+    """
+
+    def __init__(self, roots, mode: Mode = Mode.VIEW_PUBLIC,
+                 workers: int = 8):
+        """
+        Args:
+            roots: roots of the shoots
+            mode: mode the pictures of all shoots are loaded in
+            workers: number of shoots opened at the same time
+        """
+        if not isinstance(mode, Mode):
+            raise ValueError("mode attribute must be set to a mode")
+
+        self.roots = list(dict.fromkeys(os.path.abspath(root)
+                                        for root in roots))
+        self.mode = mode
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._shoots = {
+            root: _Shoot(root, mode, self._executor.submit(_open, root, mode))
+            for root in self.roots
+        }
+
+        # pictures merged so far as tuples of root and picture
+        self._seen = []
+        self._merged = self._merge()
+        self._cursor = 0
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for shoot in self._shoots.values():
+            shoot.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def errors(self) -> dict:
+        """
+        dict: roots of the shoots read so far mapped to the errors which made
+            them unreadable
+        """
+        return {
+            root: shoot.error
+            for root, shoot in self._shoots.items() if shoot.error is not None
+        }
+
+    def pictures(self, root: str) -> list:
+        """
+        Return all pictures of a shoot, reading the ones not read yet.
+
+        Returns:
+            list: the pictures sorted by name, or None if the shoot can not
+                be read
+        """
+        shoot = self._shoots[root]
+        shoot.read_all()
+        if shoot.error is not None:
+            return None
+        return list(shoot.pictures)
+
+    def _merge(self):
+        return heapq.merge(*self._shoots.values(), key=_by_name)
+
+    def _fill(self, count: int) -> bool:
+        """Merge pictures until count of them are seen, or all are."""
+        missing = count - len(self._seen)
+        if missing > 0:
+            self._seen.extend(islice(self._merged, missing))
+        return len(self._seen) >= count
+
+    def _fill_all(self):
+        self._seen.extend(self._merged)
+
+    def __iter__(self):
+        """Yield tuples of root and picture of all shoots, merged by name."""
+        yield from self._seen[:]
+        yield from self._merge_from(len(self._seen))
+
+    def _merge_from(self, start: int):
+        # a separate merge, so iterating does not move the cursor
+        return islice(self._merge(), start, None)
+
+    def __len__(self):
+        self._fill_all()
+        return len(self._seen)
+
+    @property
+    def current(self) -> Picture:
+        # waits for the catalogs, which the first picture depends on
+        if not self._fill(1):
+            return Picture(NO_PICTURE, "", self.mode)
+        return self._seen[self._cursor][1]
+
+    @property
+    def current_root(self) -> str:
+        """
+        str: root of the shoot of the current picture, or None
+        """
+        if not self._fill(1):
+            return None
+        return self._seen[self._cursor][0]
+
+    @property
+    def position(self) -> int:
+        """
+        int: index of the current picture
+        """
+        return self._cursor
+
+    def peek(self, offset: int) -> Picture:
+        """Return the picture at an offset from the current picture."""
+        index = self._cursor + offset
+        if index < 0 or not self._fill(index + 1):
+            self._fill_all()
+        if not self._seen:
+            return self.current
+        return self._seen[index % len(self._seen)][1]
+
+    def move(self, offset: int) -> Picture:
+        """
+        Move by an offset, wrapping around at the ends.
+
+        Moving forward only merges as many pictures as needed, wrapping
+        around merges all of them.
+        """
+        index = self._cursor + offset
+        if index < 0 or not self._fill(index + 1):
+            self._fill_all()
+        if self._seen:
+            self._cursor = index % len(self._seen)
+        return self.current
+
+    @property
+    def next(self) -> Picture:
+        return self.move(1)
+
+    @property
+    def previous(self) -> Picture:
+        return self.move(-1)
+
+    def apply(self) -> dict:
+        """
+        Apply the actions of the pictures of every shoot to that shoot.
+
+        Pictures with an action are dropped, the current picture stays the
+        same unless it is dropped itself, then the next one becomes current.
+        Pictures whose action can not be applied stay and keep their action.
+
+        Returns:
+            dict: roots mapped to the executed moves
+        """
+        moves = {}
+        # pictures whose action can not be applied, as tuples of root and name
+        left = set()
+        for root, shoot in self._shoots.items():
+            # only pictures which were read can have an action
+            pictures = [
+                picture for picture in shoot.pictures
+                if picture.action is not None
+            ]
+            if not pictures:
+                continue
+            src_index = ShootIndex.scan(os.path.join(root, "src"))
+            left.update((root, picture.name) for picture in pictures
+                        if not can_apply(root, picture, src_index))
+            moves[root] = apply_actions(root, pictures, src_index)
+            shoot.pictures = [
+                picture for picture in shoot.pictures
+                if picture.action is None or (root, picture.name) in left
+            ]
+
+        if moves:
+            # the merged pictures are a prefix of the merge of the remaining
+            # ones
+            kept = []
+            cursor = None
+            for index, (root, picture) in enumerate(self._seen):
+                if (picture.action is not None
+                        and (root, picture.name) not in left):
+                    continue
+                if cursor is None and index >= self._cursor:
+                    cursor = len(kept)
+                kept.append((root, picture))
+
+            count = len(kept)
+            self._seen = kept
+            self._merged = self._merge_from(count)
+            if cursor is None:
+                # filling grows kept, it is the list of seen pictures now
+                cursor = count if self._fill(count + 1) else 0
+            self._cursor = cursor
+
+        return moves
@@ -0,0 +1,209 @@
+import os
+import sys
+from array import array
+from enum import Enum
+
+Mode = Enum("Mode", "CATEGORIZING EDITING VIEW_ALL VIEW_PUBLIC")
+
+# actions of pictures, stored as their index
+ACTIONS = (None, "reject", "private")
+
+_PUBLIC = 1
+
+
+class PictureTable:
+    """
+    Columnar storage of the pictures of one mode.
+
+    Every picture is a row. Names are interned and kept in a list, actions
+    and flags in arrays of bytes. Previews are split into an interned
+    directory and the suffix following the name, e.g. ".JPG", and joined
+    again when they are asked for.
+
+    Rows are never removed, so the row of a picture does not change.
+    """
+
+    def __init__(self, mode: Mode):
+        self.mode = mode
+
+        self.names = []
+        self.actions = array('b')
+        self.flags = array('B')
+
+        self._directories = array('I')
+        self._suffixes = array('I')
+        # previews not ending up in the pattern DIRECTORY/NAME+SUFFIX
+        self._previews = {}
+
+        # interned strings, index 0 means no preview
+        self._strings = [""]
+        self._string_ids = {"": 0}
+
+        # called with the row after the action or the flags of a row changed
+        self.observer = None
+
+        # preview paths mapped to their Score, usually shared between tables
+        self.scores = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def _intern(self, string: str) -> int:
+        string_id = self._string_ids.get(string)
+        if string_id is None:
+            string_id = self._string_ids[string] = len(self._strings)
+            self._strings.append(string)
+        return string_id
+
+    def append(self, name: str, preview: str, is_public: bool = False) -> int:
+        """
+        Add a picture.
+
+        Returns:
+            int: row of the picture
+        """
+        row = len(self.names)
+        self.names.append(sys.intern(name))
+        self.actions.append(0)
+        self.flags.append(_PUBLIC if is_public else 0)
+
+        directory, file_name = os.path.split(preview)
+        if preview and file_name.startswith(name):
+            self._directories.append(self._intern(directory))
+            self._suffixes.append(self._intern(file_name[len(name):]))
+        else:
+            self._directories.append(0)
+            self._suffixes.append(0)
+            if preview:
+                self._previews[row] = preview
+
+        return row
+
+    def preview(self, row: int) -> str:
+        directory = self._directories[row]
+        if directory == 0:
+            return self._previews.get(row, "")
+        return os.path.join(
+            self._strings[directory],
+            self.names[row] + self._strings[self._suffixes[row]])
+
+    def action(self, row: int):
+        return ACTIONS[self.actions[row]]
+
+    def set_action(self, row: int, action):
+        self.actions[row] = ACTIONS.index(action)
+        if self.observer is not None:
+            self.observer(row)
+
+    def is_public(self, row: int) -> bool:
+        return bool(self.flags[row] & _PUBLIC)
+
+    def set_public(self, row: int, is_public: bool):
+        if is_public:
+            self.flags[row] |= _PUBLIC
+        else:
+            self.flags[row] &= ~_PUBLIC
+        if self.observer is not None:
+            self.observer(row)
+
+    def copy(self, table, row: int) -> int:
+        """
+        Copy a row of another table into this one.
+
+        Returns:
+            int: the new row
+        """
+        new_row = self.append(table.names[row], table.preview(row),
+                              table.is_public(row))
+        self.actions[new_row] = table.actions[row]
+        return new_row
+
+
+class Picture:
+    """
+    A picture of a shoot.
+
+    Pictures are light views onto a row of a PictureTable. A picture created
+    directly gets a table of its own.
+    """
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, name: str, preview: str, mode: Mode, **kwargs):
+        self._table = PictureTable(mode)
+        self._row = self._table.append(name, preview,
+                                       kwargs.get('is_public', False))
+
+    @classmethod
+    def view(cls, table: PictureTable, row: int):
+        """Return the picture of a row of a table."""
+        picture = cls.__new__(cls)
+        picture._table = table
+        picture._row = row
+        return picture
+
+    def __eq__(self, other):
+        return (isinstance(other, Picture) and self._table is other._table
+                and self._row == other._row)
+
+    def __hash__(self):
+        return hash((id(self._table), self._row))
+
+    @property
+    def name(self):
+        return self._table.names[self._row]
+
+    @property
+    def preview(self):
+        return self._table.preview(self._row)
+
+    @property
+    def mode(self):
+        return self._table.mode
+
+    @property
+    def action(self):
+        return self._table.action(self._row)
+
+    @property
+    def is_public(self):
+        """
+        bool: indicates if the picture has been exported publicly
+        """
+        return self._table.is_public(self._row)
+
+    @property
+    def score(self):
+        """
+        Score: focus and exposure of the picture, None if not scored yet
+        """
+        return self._table.scores.get(self.preview)
+
+    def _set_public(self, is_public: bool):
+        self._table.set_public(self._row, is_public)
+
+    def _categorizing(self, name: str):
+        if self._table.mode != Mode.CATEGORIZING:
+            raise AttributeError(
+                f"{type(self)} does not have attribute {name}")
+
+    @property
+    def reject(self):
+        """Mark the picture to be rejected, only while categorizing."""
+        self._categorizing("reject")
+        return self._reject
+
+    @property
+    def make_private(self):
+        """Mark the picture to be made private, only while categorizing."""
+        self._categorizing("make_private")
+        return self._make_private
+
+    def _reject(self):
+        self._table.set_action(self._row, "reject")
+
+    def _make_private(self):
+        self._table.set_action(self._row, "private")
+
+    def keep(self):
+        self._table.set_action(self._row, None)
@@ -1,93 +1,271 @@
 import os
-from collections import deque
-from enum import Enum
-from functools import lru_cache
+import re
+import threading
 from typing import Container
 
-from PIL import ExifTags
-from PIL import Image as PILImage
-
-Mode = Enum("Mode", "CATEGORIZING EDITING VIEW_ALL VIEW_PUBLIC")
+from pyphlow import instrument
+from pyphlow.data.bursts import find_bursts
+from pyphlow.data.catalog import Catalog
+from pyphlow.data.index import ShootIndex
+from pyphlow.data.journal import Journal
+from pyphlow.data.picture import Mode, Picture, PictureTable
+from pyphlow.data.raw import extract_previews
+from pyphlow.data.scores import SCORE_FILTERS, score_pictures
+from pyphlow.data.sequence import PictureSequence
+from pyphlow.data.watcher import watch
+
+# directories the pictures of each mode are read from
+MODE_DIRECTORIES = {
+    Mode.CATEGORIZING: ("src", os.path.join("export", "public")),
+    Mode.EDITING: ("src", "edit", os.path.join("export", "public")),
+    Mode.VIEW_ALL: (os.path.join("export", "private"),
+                    os.path.join("export", "public")),
+    Mode.VIEW_PUBLIC: (os.path.join("export", "public"), ),
+}
+
+# name of the picture shown when there are none
+NO_PICTURE = "No picture available"
+
+# most pictures handed over at once when loading in the background, the
+# first picture is handed over alone and the batches grow from there
+_MAX_BATCH = 8192
+
+# suffix of versioned exports, e.g. NAME_v2.jpg, the v keeps camera numbers
+# like IMG_0001 from being taken for versions
+_VERSION_SUFFIX = re.compile(r"_v[0-9]+$")
 
 
 class FalseDirContentError(Exception):
     pass
 
 
-class Picture:
-    def __init__(self, name: str, preview: str, mode: Mode, **kwargs):
-        self._name = name
-        self._preview = preview
+class PictureManager:
+    def __init__(self, root: str, mode: Mode, on_loaded=None):
+        """
+        Args:
+            root: root of the shoot
+            mode: mode whose pictures are shown first
+            on_loaded: if given, the pictures of the mode are loaded in a
+                background thread. The function is called from that thread
+                with the mode, a list of pictures and whether loading is done
+                for every batch of loaded pictures, which has to be passed
+                to add_loaded() on the thread using the manager. Until the
+                first batch arrives only a placeholder is shown
+        """
+        self.root = os.path.abspath(root)
+
+        if not os.path.exists(self.root):
+            raise ValueError("Path does not exist!")
+
+        if not isinstance(mode, Mode):
+            raise ValueError(f"mode attribute must be set to a mode")
+
         self._mode = mode
+        self._catalog = Catalog(self.root)
+        self._index = None
 
-        self._action = None
+        # complete moves that were interrupted last time
+        Journal(self.root).recover()
 
-        self._is_public = kwargs.get('is_public', False)
+        # picture lists of all modes loaded so far, and the names of the
+        # current pictures of lists which have to be reloaded
+        self._lists = {}
+        self._positions = {}
 
-    @property
-    def name(self):
-        return self._name
+        # picture lists being loaded in the background, and the modes whose
+        # files changed meanwhile
+        self._loading = {}
+        self._stale = set()
+
+        self._watcher = None
+
+        # preview paths of pictures mapped to the number of their burst and
+        # to their Score
+        self.bursts = {}
+        self.scores = {}
+
+        if on_loaded is None:
+            self._pictures = self._load(self.mode)
+        else:
+            self._pictures = self._load_in_background(self.mode, on_loaded)
 
     @property
-    def preview(self):
-        return self._preview
+    def next(self) -> Picture:
+        return self._pictures.move(1)
 
     @property
-    def action(self):
-        return self._action
+    def previous(self) -> Picture:
+        return self._pictures.move(-1)
+
+    def peek(self, offset: int) -> Picture:
+        """Return the picture at an offset from the current picture."""
+        return self._pictures.peek(offset)
+
+    def jump(self, index: int) -> Picture:
+        """Make the picture at an index current, negative from the end."""
+        return self._pictures.jump(index)
+
+    def jump_to(self, name: str) -> Picture:
+        """Make the first picture not sorted before a name current."""
+        return self._pictures.jump_to(name)
+
+    def next_matching(self, filter_name: str, direction: int = 1) -> Picture:
+        """
+        Move to the next picture matching a filter, e.g. "unrated" to skip
+        all pictures which already have an action.
+
+        Args:
+            filter_name: "unrated", "rejected", "private", "public" or one
+                of SCORE_FILTERS
+            direction: 1 to search forward, -1 to search backward
+        """
+        return self._pictures.next_matching(filter_name, direction)
+
+    def count(self, filter_name: str) -> int:
+        """Return the number of current pictures matching a filter."""
+        return self._pictures.count(filter_name)
 
     @property
-    def is_public(self):
+    def position(self) -> int:
         """
-        bool: indicates if the picture has been exported publicly
+        int: index of the current picture
         """
-        return self._is_public
+        return self._pictures.cursor
 
-    def _reject(self):
-        self._action = "reject"
+    def __len__(self):
+        return len(self._pictures)
 
-    def _make_private(self):
-        self._action = "private"
+    def __iter__(self):
+        return iter(self._pictures)
 
-    def keep(self):
-        self._action = None
+    def score_pictures(self, workers: int = None):
+        """
+        Score the focus and exposure of the current pictures.
 
-    def __getattr__(self, name):
-        if self._mode == Mode.CATEGORIZING:
-            if name == "reject":
-                return self._reject
-            elif name == "make_private":
-                return self._make_private
+        Afterwards the pictures can be filtered by the filters of
+        SCORE_FILTERS, e.g. next_matching("blurry").
 
-        raise AttributeError(f"{type(self)} does not have attribute {name}")
+        Args:
+            workers: number of processes computing scores
+        """
+        self.add_scores(
+            score_pictures(self.root, [picture.preview for picture in self],
+                           workers))
 
+    def add_scores(self, scores: dict):
+        """
+        Add scores computed elsewhere.
 
-class PictureManager:
-    def __init__(self, root: str, mode: Mode):
-        self.root = os.path.abspath(root)
+        Args:
+            scores: preview paths mapped to their Score
+        """
+        self.scores.update(scores)
+        for pictures in self._lists.values():
+            _add_score_filters(pictures)
 
-        if not os.path.exists(self.root):
-            raise ValueError("Path does not exist!")
+    def ranked(self, key=lambda score: score.sharpness,
+               reverse: bool = False) -> list:
+        """
+        Return the current pictures ordered by their scores, e.g. the most
+        likely blurry pictures first. Pictures without a score come last.
 
-        if not isinstance(mode, Mode):
-            raise ValueError(f"mode attribute must be set to a mode")
+        Args:
+            key: function of a Score the pictures are ordered by
+            reverse: whether to order by descending key
+        """
+        scored = [picture for picture in self if picture.score is not None]
+        unscored = [picture for picture in self if picture.score is None]
+        return sorted(scored, key=lambda picture: key(picture.score),
+                      reverse=reverse) + unscored
 
-        self._mode = mode
-        self._pictures = load_pictures(self.root, self.mode)
+    def reject_matching(self, filter_name: str) -> int:
+        """
+        Reject all undecided pictures matching a filter, e.g. "blurry".
+
+        Returns:
+            int: number of rejected pictures
+        """
+        rejected = 0
+        for index in list(self._pictures.indices(filter_name)):
+            picture = self._pictures[index]
+            if picture.action is None:
+                picture.reject()
+                rejected += 1
+        return rejected
+
+    def find_bursts(self, workers: int = None, **kwargs):
+        """
+        Group the current pictures into bursts of similar pictures.
+
+        The groups are kept by preview path, so they stay valid while
+        pictures are added or removed.
+
+        Args:
+            workers: number of processes computing hashes
+            kwargs: passed to group_bursts()
+        """
+        previews = [picture.preview for picture in self]
+        self.bursts = find_bursts(self.root, previews, workers, **kwargs)
+
+    def _burst_range(self) -> tuple:
+        pictures = self._pictures
+        start = end = pictures.cursor
+        group = self.bursts.get(pictures.current.preview)
+        if group is None:
+            return start, end + 1
+
+        while start > 0 and self.bursts.get(
+                pictures[start - 1].preview) == group:
+            start -= 1
+        while end + 1 < len(pictures) and self.bursts.get(
+                pictures[end + 1].preview) == group:
+            end += 1
+
+        return start, end + 1
+
+    def burst(self) -> list:
+        """Return the pictures of the burst of the current picture."""
+        start, end = self._burst_range()
+        return [self._pictures[index] for index in range(start, end)]
 
     @property
-    def next(self) -> Picture:
-        # rotate one picture to te left
-        self._pictures.append(self._pictures.popleft())
+    def burst_position(self) -> tuple:
+        """
+        tuple: position of the current picture within its burst and the
+            number of pictures of the burst
+        """
+        start, end = self._burst_range()
+        return self._pictures.cursor - start, end - start
 
-        return self.current_picture
+    @property
+    def next_burst(self) -> Picture:
+        """Move to the first picture of the following burst."""
+        _, end = self._burst_range()
+        return self._pictures.jump(end)
 
     @property
-    def previous(self) -> Picture:
-        # rotate one picture to the right
-        self._pictures.appendleft(self._pictures.pop())
+    def previous_burst(self) -> Picture:
+        """Move to the first picture of the preceding burst."""
+        start, _ = self._burst_range()
+        self._pictures.jump(start - 1)
+        start, _ = self._burst_range()
+        return self._pictures.jump(start)
+
+    def reject_burst(self) -> int:
+        """
+        Reject all undecided pictures of the current burst but the current
+        one.
 
-        return self.current_picture
+        Returns:
+            int: number of rejected pictures
+        """
+        current = self.current_picture
+        rejected = 0
+        for picture in self.burst():
+            if picture != current and picture.action is None:
+                picture.reject()
+                rejected += 1
+        return rejected
 
     @property
     def mode(self):
@@ -97,25 +275,290 @@ class PictureManager:
     def mode(self, new_mode):
         if not isinstance(new_mode, Mode):
             raise ValueError(f"mode attribute must be set to a mode")
-        # TODO: apply changes
         if self._mode != new_mode:
-            self._mode = new_mode
             self.apply()
+            self._mode = new_mode
+            self._pictures = self._load(new_mode)
+
+    def _load(self, mode: Mode) -> PictureSequence:
+        pictures = self._lists.get(mode)
+        if pictures is None:
+            pictures = load_pictures(self.root, mode, self._catalog)
+            position = self._positions.pop(mode, None)
+            if position is not None:
+                pictures.jump_to(position)
+            pictures.table.scores = self.scores
+            _add_score_filters(pictures)
+            self._lists[mode] = pictures
+
+        return pictures
+
+    def _load_in_background(self, mode: Mode, on_loaded) -> PictureSequence:
+        table = PictureTable(mode)
+        table.append(NO_PICTURE, "")
+        pictures = PictureSequence(table)
+        table.scores = self.scores
+        _add_score_filters(pictures)
+        self._lists[mode] = self._loading[mode] = pictures
+
+        def run():
+            batch = []
+            size = 1
+            try:
+                # sqlite connections are not shared between threads
+                with Catalog(self.root) as catalog:
+                    for picture in stream_pictures(self.root, mode, catalog):
+                        batch.append(picture)
+                        if len(batch) >= size:
+                            on_loaded(mode, batch, False)
+                            batch = []
+                            size = min(size * 2, _MAX_BATCH)
+            finally:
+                on_loaded(mode, batch, True)
+
+        threading.Thread(target=run, daemon=True).start()
+        return pictures
+
+    def add_loaded(self, mode: Mode, pictures: list, done: bool) -> bool:
+        """
+        Add pictures loaded in the background.
+
+        The placeholder is replaced by the first picture, afterwards the
+        current picture stays current. Files which changed while loading are
+        merged once loading is done.
+
+        Args:
+            mode: mode the pictures were loaded for
+            pictures: tuples of name, preview path and whether the picture
+                is public
+            done: whether these are the last pictures
+
+        Returns:
+            bool: whether the pictures of the current mode changed
+        """
+        sequence = self._loading.get(mode)
+        stale = False
+        if done:
+            del self._loading[mode]
+            stale = mode in self._stale
+            self._stale.discard(mode)
+        if self._lists.get(mode) is not sequence:
+            # the list was dropped in the meantime and is loaded again
+            return False
+
+        if pictures:
+            placeholder = (len(sequence) == 1
+                           and sequence.current.name == NO_PICTURE)
+            sequence.extend(pictures)
+            if placeholder:
+                sequence.remove_if(lambda picture: picture.name ==
+                                   NO_PICTURE and not picture.preview)
+                sequence.jump(0)
+
+        changed = bool(pictures)
+        if stale:
+            changed = _merge(sequence,
+                             load_pictures(self.root, mode,
+                                           self._catalog)) or changed
+
+        return changed and mode == self.mode
+
+    def _affected_modes(self, paths) -> list:
+        """Return the loaded modes which are read from any of the paths."""
+        if paths is None:
+            return list(self._lists)
+
+        changed = {os.path.relpath(path, self.root) for path in paths}
+        return [
+            mode for mode in self._lists
+            if any((path + os.sep).startswith(directory + os.sep)
+                   or directory.startswith(path + os.sep)
+                   for path in changed for directory in MODE_DIRECTORIES[mode])
+        ]
+
+    def _invalidate(self, paths=None):
+        """
+        Drop the cached lists of modes which are read from the given paths.
+
+        Args:
+            paths: changed paths, all lists are dropped if None
+        """
+        for mode in self._affected_modes(paths):
+            self._positions[mode] = self._lists.pop(mode).current.name
+
+    def refresh(self, paths) -> bool:
+        """
+        Update the loaded picture lists after files have changed.
+
+        Only the lists of modes reading from the changed paths are updated.
+        Pictures which are still present keep their action, new pictures are
+        inserted at their sorted position and the current picture stays
+        current unless it was removed.
+
+        Args:
+            paths: changed paths
+
+        Returns:
+            bool: whether the list of the current mode changed
+        """
+        paths = list(paths)
+
+        src_path = os.path.join(self.root, 'src')
+        if self._index is not None:
+            for path in paths:
+                if not path.startswith(src_path + os.sep):
+                    continue
+                if os.path.isfile(path):
+                    self._index.add(path)
+                else:
+                    self._index.discard(path)
+
+        changed = False
+        for mode in self._affected_modes(paths):
+            if mode in self._loading:
+                # the scan may have missed the change, merged when done
+                self._stale.add(mode)
+                continue
+            pictures = self._lists[mode]
+            fresh = load_pictures(self.root, mode, self._catalog)
+            if _merge(pictures, fresh) and mode == self.mode:
+                changed = True
+
+        return changed
+
+    def watch(self, callback):
+        """
+        Watch the shoot for changed files.
+
+        The manager is not thread safe, so the changes are not applied on the
+        thread of the watcher.
+
+        Args:
+            callback: called with the changed paths from the thread of the
+                watcher, which has to pass them to refresh() on the thread
+                using the manager
+        """
+        self.stop_watching()
+        self._watcher = watch(self.root, callback)
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    @property
+    def index(self) -> ShootIndex:
+        """
+        ShootIndex: all files in the src directory of the shoot
+        """
+        if self._index is None:
+            self._index = ShootIndex.scan(os.path.join(self.root, 'src'),
+                                          self._catalog.scandir)
+        return self._index
 
     def apply(self):
-        apply_actions(self.root, self._pictures)
-        self._pictures = load_pictures(self.root, self.mode)
+        """
+        Apply the actions of all pictures.
+
+        Pictures with an action leave the src directory, so they are dropped
+        from the pictures of the current mode. The current picture stays the
+        same unless it is dropped itself, then the next one becomes current.
+        Pictures whose action can not be applied stay and keep their action.
+        """
+        if self._pictures.count("unrated") == len(self._pictures):
+            return
+
+        left = {
+            picture.name
+            for picture in self._pictures
+            if not can_apply(self.root, picture, self.index)
+        }
+        moves = apply_actions(self.root, self._pictures, self.index)
+
+        del self._lists[self.mode]
+        self._invalidate(path for move in moves for path in move)
+
+        self._pictures.remove_if(lambda picture: picture.action is not None
+                                 and picture.name not in left)
+        if not self._pictures:
+            self._pictures.insert(Picture(NO_PICTURE, "", self.mode))
+        self._lists[self.mode] = self._pictures
+
+    def undo(self):
+        """
+        Revert the last applied actions.
+
+        The reverted pictures come back without an action, the actions which
+        have not been applied yet are kept.
+        """
+        moves = undo_actions(self.root)
+        if moves:
+            self.refresh(path for move in moves for path in move)
 
     @property
     def current_picture(self):
-        return self._pictures[0]
+        return self._pictures.current
+
+
+def _merge(pictures: PictureSequence, fresh) -> bool:
+    """
+    Update a sequence of pictures in place to match a freshly loaded list.
+
+    Only the differences are applied, pictures which are still present keep
+    their action.
+
+    Returns:
+        bool: whether pictures were added, removed or changed
+    """
+    current = pictures.current
+    existing = {(picture.name, picture.preview): picture
+                for picture in pictures}
+    fresh = {(picture.name, picture.preview): picture for picture in fresh}
+
+    changed = False
+    if any(key not in fresh for key in existing):
+        pictures.remove_if(
+            lambda picture: (picture.name, picture.preview) not in fresh)
+        changed = True
+
+    for key, picture in fresh.items():
+        old = existing.get(key)
+        if old is None:
+            pictures.insert(picture)
+            changed = True
+        elif old.is_public != picture.is_public:
+            old._set_public(picture.is_public)
+            changed = True
+
+    if changed and pictures.index_of(current) < 0:
+        pictures.jump_to(current.name)
+
+    return changed
+
+
+def _add_score_filters(pictures: PictureSequence):
+    for filter_name, test in SCORE_FILTERS.items():
+        pictures.set_filter(filter_name, _score_test(test))
+
 
+def _score_test(test):
 
-def find_jpg(root, name):
-    for ext in ("jpg", "JPG", "jpeg", "JPEG"):
-        path = os.path.join(root, f"{name}.{ext}")
-        if os.path.exists(path):
-            return path
+    def matches(table, row) -> bool:
+        if not table.scores:
+            return False
+        score = table.scores.get(table.preview(row))
+        return score is not None and test(score)
+
+    return matches
+
+
+def find_jpg(root, name, index: ShootIndex = None):
+    if index is None:
+        index = ShootIndex.scan(root, recursive=False)
+
+    path = index.jpg(name, directory=root)
+    if path is not None:
+        return path
 
     raise FileNotFoundError(f"Picture {name} not in {root}")
 
@@ -127,168 +570,248 @@ def displayable(file_name):
     return False
 
 
-def load_pictures(root: str, mode: Mode) -> deque:
+def public_index(file_names) -> frozenset:
+    """
+    Index the names of exported pictures.
+
+    Args:
+        file_names: file names in the export directory
+
+    Returns:
+        frozenset: picture names with and without version suffix
+    """
+    stems = set()
+    for file_name in file_names:
+        name, *ext = file_name.split('.')
+        stems.add(name)
+        stems.add(_VERSION_SUFFIX.sub("", name))
+
+    return frozenset(stems)
+
+
+def load_pictures(root: str,
+                  mode: Mode,
+                  catalog: Catalog = None) -> PictureSequence:
     """
     Parse picture directory.
 
     Parse directory tree for pictures and sort them into categories.
-    Return a deque containing all pictures sorted by their names.
+    Return a sequence containing all pictures sorted by their names.
+
+    The result is served from the catalog of the shoot as long as none of the
+    directories it was built from has been modified.
 
     Args:
         root: path to the root of the directory tree for the pictures
         mode: mode of the application, so that only necessary pictures are loaded
+        catalog: catalog of the shoot, opened temporarily if not given
 
     Returns:
-        deque: double ended queue of picture objects
+        PictureSequence: the pictures, stored in a single table
     """
+    if catalog is None:
+        with Catalog(root) as catalog:
+            return load_pictures(root, mode, catalog)
 
-    # paths of subdirectories
+    with instrument.span("scan", mode=mode.name):
+        table = PictureTable(mode)
+        for name, preview, is_public in stream_pictures(root, mode, catalog):
+            table.append(name, preview, is_public)
 
-    export_path = os.path.join(root, 'export')
+    if len(table) == 0:
+        table.append(NO_PICTURE, "")
+    return PictureSequence(table)
 
-    # list all picture names
 
-    pictures = []
+def stream_pictures(root: str, mode: Mode, catalog: Catalog):
+    """
+    Yield the pictures of a mode as they are found.
 
-    if mode == Mode.CATEGORIZING or mode == Mode.EDITING:
-        src_path = os.path.join(root, 'src')
-        picture_names = set()
+    Pictures stored in the catalog are yielded in name order. Otherwise the
+    directories are scanned and pictures are yielded as they are found, not
+    necessarily sorted, the complete list is stored in the catalog once the
+    scan is finished.
 
-        for path, dirs, files in os.walk(src_path):
-            for picture in files:
-                if picture.endswith((".xmp", ".XMP")):
-                    continue
-                name, *ext = picture.split('.')
+    Args:
+        root: path to the root of the directory tree for the pictures
+        mode: mode of the application
+        catalog: catalog of the shoot
+
+    Yields:
+        tuple: name, preview path and whether the picture is public
+    """
+    pictures = catalog.load(mode.name)
+    if pictures is not None:
+        instrument.count("scan.catalog_hits")
+        yield from pictures
+        return
+
+    instrument.count("scan.rescans")
+    found = []
+    with catalog.record() as dependencies:
+        for picture in _scan_pictures(root, mode, catalog):
+            found.append(picture)
+            yield picture
+    catalog.store(mode.name, sorted(found, key=lambda x: x[0]), dependencies)
+
+
+def _scan_pictures(root: str, mode: Mode, catalog: Catalog):
+    # yields tuples of name, preview and whether the picture is public
+
+    # paths of subdirectories
 
-                picture_names.add(name)
+    export_path = os.path.join(root, 'export')
 
-        for name in sorted(list(picture_names)):
-            exported_to_public = any(name in pic for pic in os.listdir(
-                os.path.join(export_path, 'public')))
+    # list all picture names
+
+    if mode == Mode.CATEGORIZING or mode == Mode.EDITING:
+        public = public_index(
+            name for name, is_dir in catalog.scandir(
+                os.path.join(export_path, 'public')) if not is_dir)
 
-            pictures.append(
-                Picture(name, find_jpg(os.path.join(src_path, "jpg"), name),
-                        mode, is_public=exported_to_public))
+        src_path = os.path.join(root, 'src')
+        src_index = ShootIndex.scan(src_path, catalog.scandir)
+        picture_names = src_index.names()
+
+        jpg_path = os.path.join(src_path, "jpg")
+        raw_only = {}
+        for name in sorted(picture_names):
+            raw = src_index.raw(name)
+            if raw and src_index.jpg(name, jpg_path) is None:
+                raw_only[name] = raw
+            else:
+                yield name, find_jpg(jpg_path, name, src_index), name in public
+
+        # extracting embedded previews is slow, so the pictures with a JPEG
+        # come first
+        raw_previews = extract_previews(root, raw_only)
+        for name in sorted(raw_only):
+            yield name, raw_previews.get(name, ""), name in public
 
     if mode == Mode.EDITING:
         edit_path = os.path.join(root, 'edit')
 
-        for directory in os.listdir(edit_path):
+        for directory in catalog.listdir(edit_path):
             picture_names.add(directory)
-            for picture in os.listdir(os.path.join(edit_path, directory)):
-                exported_to_public = any(directory in pic for pic in os.listdir(
-                    os.path.join(export_path, 'public')))
+            exported_to_public = directory in public
 
+            for picture in catalog.listdir(os.path.join(edit_path, directory)):
                 preview = os.path.join(edit_path, directory,
                                        picture) if displayable(picture) else ""
 
-                pictures.append(Picture(picture, preview, mode,
-                                        exported_to_public=exported_to_public))
+                yield picture, preview, exported_to_public
 
     if mode == Mode.VIEW_ALL:
         private_path = os.path.join(export_path, 'private')
-        for picture in os.listdir(private_path):
-            name, *ext = picture.split('.')
-            pictures.append(Picture(name, find_jpg(private_path, name), mode))
+        private_index = ShootIndex.scan(private_path, catalog.scandir,
+                                        recursive=False)
+        for picture, is_dir in catalog.scandir(private_path):
+            if not is_dir:
+                name, *ext = picture.split('.')
+                yield (name, find_jpg(private_path, name, private_index),
+                       False)
 
     if mode == Mode.VIEW_ALL or mode == Mode.VIEW_PUBLIC:
         public_path = os.path.join(export_path, 'public')
-        for picture in os.listdir(public_path):
-            if os.path.isfile(os.path.join(public_path, picture)):
+        public_files = ShootIndex.scan(public_path, catalog.scandir,
+                                       recursive=False)
+        for picture, is_dir in catalog.scandir(public_path):
+            if not is_dir:
                 name, *ext = picture.split('.')
-                pictures.append(
-                    Picture(name, find_jpg(public_path, name), mode))
+                yield (name, find_jpg(public_path, name, public_files),
+                       False)
+
+
+def can_apply(root: str, picture: Picture, index: ShootIndex) -> bool:
+    """
+    Return whether the action of a picture can be applied.
+
+    Raw-only pictures have no jpg to export, so they can not be made private.
+    """
+    return (picture.action != "private"
+            or index.jpg(picture.name, os.path.join(root, "src", "jpg"))
+            is not None)
 
-    if len(pictures) > 0:
-        return deque(sorted(pictures, key=lambda x: x.name))
-    else:
-        return deque([Picture("No picture available", "", mode)])
 
+def _reject_src(root, picture, index: ShootIndex) -> list:
+    src_path = os.path.join(root, 'src')
 
-def _reject_src(root, picture):
-    for subdir in os.listdir(os.path.join(root, "src")):
-        for pic_file in os.listdir(os.path.join(root, "src", subdir)):
-            if picture.name in pic_file:
-                old_path = os.path.join(root, 'src', subdir, pic_file)
-                new_path = os.path.join(root, 'rejected', 'src', subdir,
-                                        pic_file)
+    return [(old_path,
+             os.path.join(root, 'rejected', 'src',
+                          os.path.relpath(old_path, src_path)))
+            for old_path in index.files(picture.name)]
 
-                print(f"From: {old_path}\nTo: {new_path}")
 
-                os.makedirs(os.path.dirname(new_path), exist_ok=True)
-                os.rename(old_path, new_path)
+def plan_actions(root: str, pictures: Container[Picture],
+                 index: ShootIndex) -> list:
+    """
+    Plan the file moves needed to apply the actions of pictures.
 
+    Pictures whose action can not be applied, see can_apply(), are left
+    alone.
+
+    Args:
+        root: path to the root of the directory tree for the pictures
+        pictures: pictures whose actions are applied
+        index: index of the src directory
 
-def apply_actions(root: str, pictures: Container[Picture]):
+    Returns:
+        list: tuples of old and new path
+    """
+    moves = []
     for picture in pictures:
-        if picture.action is None:
+        if picture.action is None or not can_apply(root, picture, index):
             continue
 
         if picture.action == "reject":
             # root/src/jpg
             # root/src
-            _reject_src(root, picture)
+            moves.extend(_reject_src(root, picture, index))
         elif picture.action == "private":
             # first move jpg to private folder
             jpg_path = os.path.join(root, "src", "jpg")
-            old_path = find_jpg(jpg_path, picture.name)
+            old_path = index.jpg(picture.name, jpg_path)
             new_path = os.path.join(root, "export", "private",
                                     os.path.basename(old_path))
-            print(f"From: {old_path}\nTo: {new_path}")
-
-            os.rename(old_path, new_path)
+            moves.append((old_path, new_path))
 
             # then reject
-            _reject_src(root, picture)
+            moves.extend(move for move in _reject_src(root, picture, index)
+                         if move[0] != old_path)
         else:
             raise IOError(f"Picture {picture.name} has undefined "
                           f"action: {picture.action}")
 
+    return moves
+
 
-@lru_cache()
-def get_picture_angle(path) -> int:
-    # TODO: Maybe replace exif reading?
+def apply_actions(root: str,
+                  pictures: Container[Picture],
+                  index: ShootIndex = None) -> list:
     """
-    from PIL import Image
-    import piexif
-
-    im = Image.open(filename)
-    exif_dict = piexif.load(im.info["exif"])
-    # process im and exif_dict...
-    w, h = im.size
-    exif_dict["0th"][piexif.ImageIFD.XResolution] = (w, 1)
-    exif_dict["0th"][piexif.ImageIFD.YResolution] = (h, 1)
-    exif_bytes = piexif.dump(exif_dict)
-    im.save(new_file, "jpeg", exif=exif_bytes)
-
-    exif_dict = piexif.load(im.info["exif"])
-    exif_dict["0th"][piexif.ImageIFD.Orientation]
+    Apply the actions of pictures to the files of a shoot.
+
+    All moves are planned first and written to the journal of the shoot, then
+    they are executed concurrently. The index is updated accordingly.
+
+    Returns:
+        list: the executed moves as tuples of old and new path
     """
-    if path is None or not os.path.exists(path):
-        return 0
+    if index is None:
+        index = ShootIndex.scan(os.path.join(root, 'src'))
 
-    angle = 0
-    with PILImage.open(path) as img:
-        # Often, the picture is not rotated correctly.
-        # The correct orientation is
-        # written to the Exif metadata by the camera.
+    moves = Journal(root).run(plan_actions(root, pictures, index))
+    for old_path, _ in moves:
+        index.discard(old_path)
 
-        exif_data = img._getexif()
-        if exif_data:
-            try:
-                orientation = {
-                    ExifTags.TAGS[k]: v
-                    for k, v in exif_data.items() if k in ExifTags.TAGS
-                }['Orientation']
-            except KeyError as e:
-                print('KeyError!!!!', path)
-                print(e)
-                orientation = 0
-            if orientation == 3:
-                angle = 180
-            elif orientation == 6:
-                angle = 270
-            elif orientation == 8:
-                angle = 90
-
-    return angle
+    return moves
+
+
+def undo_actions(root: str) -> list:
+    """
+    Revert the moves of the last apply_actions call.
+
+    Returns:
+        list: the reverted moves as tuples of old and new path
+    """
+    return Journal(root).undo()
@@ -0,0 +1,186 @@
+import hashlib
+import os
+
+from pyphlow import util
+from pyphlow.data.catalog import CATALOG_DIR
+
+PREVIEW_DIR = "previews"
+
+# EXIF orientations which swap width and height
+TRANSPOSED = (5, 6, 7, 8)
+
+
+def _decode(source: str, size: tuple):
+    # decodes at the smallest DCT scale that is still larger than the
+    # requested size and rotates according to the EXIF orientation
+    from PIL import Image as PILImage
+    from PIL import ImageOps
+
+    with PILImage.open(source) as img:
+        width, height = size
+        if img.getexif().get(0x0112) in TRANSPOSED:
+            width, height = height, width
+        img.draft('RGB', (width, height))
+
+        picture = ImageOps.exif_transpose(img).convert('RGB')
+        picture.thumbnail(size)
+
+    return picture
+
+
+def decode_picture(source: str, size: tuple):
+    """
+    Decode a picture for display.
+
+    The picture is decoded close to the requested size and rotated according
+    to its EXIF orientation, so it can be shown upright without scaling.
+
+    Args:
+        source: path of the picture
+        size: maximum width and height
+
+    Returns:
+        tuple: width and height of the decoded picture and its pixels as RGB
+            bytes, from the top row down
+    """
+    picture = _decode(source, size)
+    return picture.size, picture.tobytes()
+
+
+def generate_preview(source: str, target: str, size: tuple,
+                     quality: int = 85):
+    """
+    Write a downscaled copy of a picture.
+
+    The picture is decoded at the smallest DCT scale that is still larger than
+    the requested size and rotated according to its EXIF orientation, so the
+    preview needs no further rotation.
+
+    Args:
+        source: path of the picture
+        target: path of the preview
+        size: maximum width and height of the preview
+        quality: JPEG quality of the preview
+    """
+    preview = _decode(source, size)
+
+    with util.atomic_write(target) as f:
+        preview.save(f, "JPEG", quality=quality)
+
+
+class PreviewCache:
+    """
+    Screen sized previews of the pictures of a shoot.
+
+    Previews are stored in the catalog directory of the shoot and are keyed by
+    path, size and modification time of the picture, so changed pictures get a
+    new preview. The cache is evicted by total size, oldest previews first.
+    """
+
+    def __init__(self,
+                 root: str,
+                 size: tuple = (1920, 1080),
+                 max_bytes: int = 2 * 1024**3,
+                 quality: int = 85):
+        self.directory = os.path.join(os.path.abspath(root), CATALOG_DIR,
+                                      PREVIEW_DIR)
+        self.size = tuple(size)
+        self.max_bytes = max_bytes
+        self.quality = quality
+
+        self._generated = 0
+
+    def path_for(self, source: str) -> str:
+        """Return the path of the preview of a picture."""
+        stat = os.stat(source)
+        key = hashlib.sha1(
+            f"{os.path.abspath(source)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+            f"\0{self.size[0]}x{self.size[1]}".encode()).hexdigest()
+
+        return os.path.join(self.directory, key[:2], f"{key}.jpg")
+
+    def lookup(self, source: str):
+        """Return the path of the preview if it has been generated, else None"""
+        try:
+            target = self.path_for(source)
+        except OSError:
+            return None
+
+        return target if os.path.exists(target) else None
+
+    def get(self, source: str) -> str:
+        """
+        Return the path of the preview of a picture.
+
+        The preview is generated if it does not exist yet. If that is not
+        possible the picture itself is returned.
+        """
+        try:
+            target = self.path_for(source)
+            if not os.path.exists(target):
+                generate_preview(source, target, self.size, self.quality)
+                self._generated += 1
+                if self._generated % 64 == 0:
+                    self.evict()
+        except OSError:
+            return source
+
+        return target
+
+    def warm(self, sources, workers: int = None) -> int:
+        """
+        Generate the previews of many pictures in parallel.
+
+        Args:
+            sources: paths of the pictures
+            workers: number of processes, defaults to the number of CPUs
+
+        Returns:
+            int: number of generated previews
+        """
+        jobs = {}
+        for source in sources:
+            try:
+                target = self.path_for(source)
+            except OSError:
+                continue
+            if not os.path.exists(target):
+                jobs[target] = source
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        generated = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(generate_preview, source, target, self.size,
+                                self.quality)
+                for target, source in jobs.items()
+            ]
+            for future in futures:
+                if future.exception() is None:
+                    generated += 1
+
+        self.evict()
+        return generated
+
+    def evict(self):
+        """Remove the oldest previews until the cache fits its size limit."""
+        previews = []
+        for path, dirs, files in os.walk(self.directory):
+            for file in files:
+                try:
+                    stat = os.stat(os.path.join(path, file))
+                except FileNotFoundError:
+                    continue
+                previews.append(
+                    (stat.st_mtime, stat.st_size, os.path.join(path, file)))
+
+        total = sum(size for _, size, _ in previews)
+        for _, size, path in sorted(previews):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,194 @@
+import os
+import struct
+
+from pyphlow import util
+from pyphlow.data.catalog import CATALOG_DIR
+from pyphlow.data.exif import ORIENTATION, TiffReader, find_tiff
+
+RAW_PREVIEW_DIR = "raw"
+
+# the image file directories are usually within the first few KB, the
+# embedded previews they point to can be anywhere in the file
+_HEADER_SIZE = 256 * 1024
+
+_SUBIFDS = 0x014A
+_EXIF_IFD = 0x8769
+_NEW_SUBFILE_TYPE = 0x00FE
+_COMPRESSION = 0x0103
+_STRIP_OFFSETS = 0x0111
+_STRIP_BYTE_COUNTS = 0x0117
+_JPEG_OFFSET = 0x0201
+_JPEG_LENGTH = 0x0202
+
+
+def _walk(reader: TiffReader):
+    """Yield all image file directories reachable from the first one."""
+    pending = [reader.first_ifd]
+    seen = set()
+
+    while pending:
+        offset = pending.pop()
+        if offset == 0 or offset in seen:
+            continue
+        seen.add(offset)
+
+        entries, next_offset = reader.ifd(offset)
+        yield entries
+
+        pending.append(next_offset)
+        pending.extend(entries.get(_SUBIFDS) or ())
+        pending.extend(entries.get(_EXIF_IFD) or ())
+
+
+def _candidates(entries: dict):
+    if _JPEG_OFFSET in entries and _JPEG_LENGTH in entries:
+        yield entries[_JPEG_OFFSET][0], entries[_JPEG_LENGTH][0]
+
+    compression = (entries.get(_COMPRESSION) or (None, ))[0]
+    subfile_type = (entries.get(_NEW_SUBFILE_TYPE) or (None, ))[0]
+    offsets = entries.get(_STRIP_OFFSETS) or ()
+    counts = entries.get(_STRIP_BYTE_COUNTS) or ()
+
+    # compression 7 is also used for the lossless raw data itself, so only
+    # reduced resolution images are accepted
+    if (compression == 6 or (compression == 7 and subfile_type == 1)) \
+            and len(offsets) == 1 and len(counts) == 1:
+        yield offsets[0], counts[0]
+
+
+def find_embedded_jpeg(path: str):
+    """
+    Locate the largest JPEG preview embedded in a TIFF based raw file.
+
+    Args:
+        path: path of the raw file
+
+    Returns:
+        tuple: offset and length of the preview and the EXIF orientation of
+            the raw file, or None if there is no preview
+    """
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER_SIZE)
+
+    start = find_tiff(header)
+    if start is None:
+        return None
+
+    try:
+        reader = TiffReader(header, start)
+        directories = list(_walk(reader))
+    except (ValueError, struct.error):
+        return None
+
+    orientation = (directories[0].get(ORIENTATION) or (0, ))[0]
+    size = os.path.getsize(path)
+
+    best = None
+    for entries in directories:
+        for offset, length in _candidates(entries):
+            offset += start
+            if length > 0 and offset + length <= size and (
+                    best is None or length > best[1]):
+                best = (offset, length)
+
+    if best is None:
+        return None
+
+    return best[0], best[1], orientation
+
+
+def _orientation_segment(orientation: int) -> bytes:
+    tiff = (b'MM' + struct.pack('>HI', 42, 8) + struct.pack('>H', 1) +
+            struct.pack('>HHIHH', ORIENTATION, 3, 1, orientation, 0) +
+            struct.pack('>I', 0))
+    payload = b'Exif\0\0' + tiff
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def extract_preview(source: str, target: str) -> bool:
+    """
+    Write the embedded JPEG preview of a raw file.
+
+    The preview is not demosaiced, it is copied as stored by the camera. If it
+    has no EXIF data of its own, the orientation of the raw file is added.
+
+    Args:
+        source: path of the raw file
+        target: path of the JPEG file to write
+
+    Returns:
+        bool: whether the raw file contained a preview
+    """
+    found = find_embedded_jpeg(source)
+    if found is None:
+        return False
+    offset, length, orientation = found
+
+    with open(source, 'rb') as f:
+        f.seek(offset)
+        jpeg = f.read(length)
+
+    if jpeg[:2] != b'\xff\xd8':
+        return False
+
+    if orientation and find_tiff(jpeg[:64 * 1024]) is None:
+        jpeg = jpeg[:2] + _orientation_segment(orientation) + jpeg[2:]
+
+    with util.atomic_write(target) as f:
+        f.write(jpeg)
+
+    return True
+
+
+def raw_preview_path(root: str, name: str) -> str:
+    """Return the path the preview of a raw-only picture is extracted to."""
+    return os.path.join(root, CATALOG_DIR, RAW_PREVIEW_DIR, f"{name}.jpg")
+
+
+def extract_previews(root: str, raw_files: dict, workers: int = None) -> dict:
+    """
+    Extract the previews of many raw files in parallel.
+
+    Previews which are newer than their raw file are not extracted again.
+
+    Args:
+        root: root of the shoot
+        raw_files: picture names mapped to the paths of their raw files
+        workers: number of processes, defaults to the number of CPUs
+
+    Returns:
+        dict: picture names mapped to the paths of their previews, pictures
+            without an embedded preview are left out
+    """
+    previews = {}
+    jobs = {}
+    for name, source in raw_files.items():
+        target = raw_preview_path(root, name)
+        try:
+            if os.stat(target).st_mtime_ns >= os.stat(source).st_mtime_ns:
+                previews[name] = target
+                continue
+        except OSError:
+            pass
+        jobs[name] = (source, target)
+
+    if len(jobs) == 1:
+        for name, (source, target) in jobs.items():
+            try:
+                if extract_preview(source, target):
+                    previews[name] = target
+            except OSError:
+                pass
+    elif jobs:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                name: executor.submit(extract_preview, source, target)
+                for name, (source, target) in jobs.items()
+            }
+            for name, future in futures.items():
+                if future.exception() is None and future.result():
+                    previews[name] = jobs[name][1]
+
+    return previews
@@ -0,0 +1,104 @@
+from typing import NamedTuple
+
+from pyphlow.data import features
+from pyphlow.data.catalog import Catalog
+
+FEATURE = "score"
+
+# longest edge of the grey image the scores are computed on
+SCORE_SIZE = 512
+
+# variance of the Laplacian below which a picture is likely blurry
+BLUR_THRESHOLD = 100.
+# share of pure black or white pixels from which a picture counts as clipped
+CLIP_SHARE = .05
+# mean brightness outside of which a picture counts as badly exposed
+EXPOSURE_RANGE = (.15, .85)
+
+
+class Score(NamedTuple):
+    """Quality measures of a picture."""
+    # variance of the Laplacian, higher is sharper
+    sharpness: float
+    # share of black pixels
+    shadows: float
+    # share of white pixels
+    highlights: float
+    # mean brightness from 0 to 1
+    exposure: float
+
+
+def score_picture(path: str, size: int = SCORE_SIZE):
+    """
+    Score the focus and exposure of a picture.
+
+    The picture is decoded at a fraction of its size and converted to grey
+    values, all measures are computed on the whole array at once.
+
+    Returns:
+        list: the values of a Score, or None if the picture can not be read
+    """
+    import numpy as np
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            image.draft('L', (size, size))
+            grey = image.convert('L')
+            grey.thumbnail((size, size))
+            pixels = np.asarray(grey, dtype=np.float32)
+    except OSError:
+        return None
+
+    laplacian = (pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] +
+                 pixels[1:-1, 2:] - 4 * pixels[1:-1, 1:-1])
+
+    return [
+        float(laplacian.var()),
+        float(np.mean(pixels <= 2)),
+        float(np.mean(pixels >= 253)),
+        float(pixels.mean() / 255),
+    ]
+
+
+def is_blurry(score: Score) -> bool:
+    return score.sharpness < BLUR_THRESHOLD
+
+
+def is_clipped(score: Score) -> bool:
+    return score.shadows > CLIP_SHARE or score.highlights > CLIP_SHARE
+
+
+def is_badly_exposed(score: Score) -> bool:
+    return not EXPOSURE_RANGE[0] <= score.exposure <= EXPOSURE_RANGE[1]
+
+
+# filters of pictures by their scores
+SCORE_FILTERS = {
+    "blurry": is_blurry,
+    "clipped": is_clipped,
+    "badly_exposed": is_badly_exposed,
+}
+
+
+def score_pictures(root: str, paths, workers: int = None) -> dict:
+    """
+    Score many pictures in parallel.
+
+    Scores are cached in the catalog of the shoot per path and mtime.
+
+    Args:
+        root: root of the shoot
+        paths: paths of the pictures
+        workers: number of processes, defaults to the number of CPUs
+
+    Returns:
+        dict: paths mapped to their Score, pictures which can not be read
+            are left out
+    """
+    paths = [path for path in paths if path]
+    with Catalog(root) as catalog:
+        values = features.compute(FEATURE, score_picture, paths, catalog,
+                                  workers)
+
+    return {path: Score(*value) for path, value in values.items()}
@@ -0,0 +1,326 @@
+from array import array
+from bisect import bisect_left
+
+from pyphlow.data.picture import ACTIONS, Picture, PictureTable
+
+_REJECT = ACTIONS.index("reject")
+_PRIVATE = ACTIONS.index("private")
+
+# filters of a PictureSequence and the test deciding if a row belongs
+FILTERS = {
+    "unrated": lambda table, row: table.actions[row] == 0,
+    "rejected": lambda table, row: table.actions[row] == _REJECT,
+    "private": lambda table, row: table.actions[row] == _PRIVATE,
+    "public": lambda table, row: table.is_public(row),
+}
+
+
+# most unsorted pictures extend() inserts one by one instead of merging
+_MAX_INSERTS = 32
+
+
+class PictureSequence:
+    """
+    Pictures sorted by name with a cursor on the current picture.
+
+    Moving the cursor to an index is O(1), looking up a name O(log n). For
+    every filter a bitset of the matching pictures is kept, which is updated
+    whenever the action of a picture changes, so the next picture matching a
+    filter is found without looking at the pictures in between.
+
+    The pictures are stored in a PictureTable, Picture objects are only
+    created when a picture is accessed.
+    """
+
+    def __init__(self, table: PictureTable):
+        self._table = table
+        table.observer = self._changed
+        self._filters = dict(FILTERS)
+
+        rows = sorted(range(len(table)), key=table.names.__getitem__)
+        self._reset(array('I', rows))
+
+    @property
+    def mode(self):
+        return self._table.mode
+
+    @property
+    def table(self) -> PictureTable:
+        return self._table
+
+    def _reset(self, rows: array, cursor: int = 0):
+        self._rows = rows
+        self._names = [self._table.names[row] for row in rows]
+        self._cursor = cursor
+
+        self._bits = {
+            name: _bitset(test(self._table, row) for row in rows)
+            for name, test in self._filters.items()
+        }
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        table = self._table
+        return (Picture.view(table, row) for row in self._rows)
+
+    def __getitem__(self, index: int):
+        return Picture.view(self._table, self._rows[index])
+
+    @property
+    def cursor(self) -> int:
+        """
+        int: index of the current picture
+        """
+        return self._cursor
+
+    @property
+    def current(self):
+        return self[self._cursor]
+
+    def peek(self, offset: int):
+        """Return the picture at an offset from the current one."""
+        return self[(self._cursor + offset) % len(self._rows)]
+
+    def move(self, offset: int):
+        """Move the cursor by an offset, wrapping around at the ends."""
+        return self.jump(self._cursor + offset)
+
+    def jump(self, index: int):
+        """Move the cursor to an index."""
+        self._cursor = index % len(self._rows)
+        return self.current
+
+    def find(self, name: str) -> int:
+        """
+        Returns:
+            int: index of the first picture with a name, or -1
+        """
+        index = bisect_left(self._names, name)
+        if index < len(self._names) and self._names[index] == name:
+            return index
+        return -1
+
+    def jump_to(self, name: str):
+        """Move the cursor to the first picture not sorted before a name."""
+        index = bisect_left(self._names, name)
+        return self.jump(index if index < len(self._names) else 0)
+
+    def set_filter(self, filter_name: str, test):
+        """
+        Add a filter, or compute the bitset of an existing one again.
+
+        Args:
+            filter_name: name of the filter
+            test: function of a PictureTable and a row, deciding if the
+                picture of the row matches
+        """
+        self._filters[filter_name] = test
+        self._bits[filter_name] = _bitset(
+            test(self._table, row) for row in self._rows)
+
+    def matching(self, filter_name: str) -> int:
+        """
+        Returns:
+            int: bitset of the pictures matching a filter
+        """
+        return self._bits[filter_name]
+
+    def indices(self, filter_name: str):
+        """Yield the indices of all pictures matching a filter."""
+        bits = self._bits[filter_name]
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
+
+    def count(self, filter_name: str) -> int:
+        """Return the number of pictures matching a filter."""
+        return bin(self._bits[filter_name]).count("1")
+
+    def next_matching(self, filter_name: str, direction: int = 1):
+        """
+        Move the cursor to the next picture matching a filter.
+
+        The search wraps around at the ends. The cursor does not move if no
+        other picture matches.
+
+        Args:
+            filter_name: one of FILTERS or a filter added by set_filter()
+            direction: 1 to search forward, -1 to search backward
+
+        Returns:
+            Picture: the new current picture
+        """
+        bits = self._bits[filter_name]
+        cursor = self._cursor
+
+        if direction > 0:
+            after = bits >> (cursor + 1)
+            if after:
+                return self.jump(cursor + 1 + _lowest_bit(after))
+            before = bits & ((1 << (cursor + 1)) - 1)
+            if before:
+                return self.jump(_lowest_bit(before))
+        else:
+            before = bits & ((1 << cursor) - 1)
+            if before:
+                return self.jump(before.bit_length() - 1)
+            after = bits >> cursor
+            if after:
+                return self.jump(cursor + after.bit_length() - 1)
+
+        return self.current
+
+    def insert(self, picture) -> int:
+        """
+        Insert a picture at its sorted position.
+
+        The picture is copied into the table of the sequence and becomes a
+        view onto the copy. The cursor stays on the current picture.
+
+        Returns:
+            int: index of the inserted picture
+        """
+        if picture._table is not self._table:
+            picture._row = self._table.copy(picture._table, picture._row)
+            picture._table = self._table
+        return self._insert_row(picture._row)
+
+    def extend(self, pictures):
+        """
+        Add pictures at their sorted positions.
+
+        Pictures sorted after all others, as when loading pictures in name
+        order, are appended in bulk. The cursor stays on the current picture.
+
+        Args:
+            pictures: tuples of name, preview path and whether the picture
+                is public
+        """
+        table = self._table
+        rows = array('I', (table.append(*picture) for picture in pictures))
+        if not rows:
+            return
+
+        names = [table.names[row] for row in rows]
+        if (all(a <= b for a, b in zip(names, names[1:]))
+                and (not self._names or self._names[-1] <= names[0])):
+            offset = len(self._rows)
+            self._rows.extend(rows)
+            self._names.extend(names)
+            for name, test in self._filters.items():
+                self._bits[name] |= _bitset(
+                    test(table, row) for row in rows) << offset
+        elif len(rows) <= _MAX_INSERTS:
+            for row in rows:
+                self._insert_row(row)
+        else:
+            # every insert shifts all bitsets, merging is cheaper
+            current = self._rows[self._cursor] if self._rows else None
+            merged = sorted(self._rows + rows, key=table.names.__getitem__)
+            cursor = merged.index(current) if current is not None else 0
+            self._reset(array('I', merged), cursor)
+
+    def _insert_row(self, row: int) -> int:
+        name = self._table.names[row]
+        index = bisect_left(self._names, name)
+        self._rows.insert(index, row)
+        self._names.insert(index, name)
+
+        for filter_name, test in self._filters.items():
+            bits = self._bits[filter_name]
+            low = bits & ((1 << index) - 1)
+            bits = low | ((bits >> index) << (index + 1))
+            if test(self._table, row):
+                bits |= 1 << index
+            self._bits[filter_name] = bits
+
+        if index <= self._cursor and len(self._rows) > 1:
+            self._cursor += 1
+
+        return index
+
+    def remove(self, index: int):
+        """
+        Remove the picture at an index.
+
+        If it is the current picture, the following one becomes current.
+        """
+        picture = self[index]
+        del self._rows[index]
+        del self._names[index]
+
+        for name in self._filters:
+            bits = self._bits[name]
+            low = bits & ((1 << index) - 1)
+            self._bits[name] = low | ((bits >> (index + 1)) << index)
+
+        if index < self._cursor:
+            self._cursor -= 1
+        if self._cursor >= len(self._rows):
+            self._cursor = 0
+
+        return picture
+
+    def remove_if(self, predicate) -> int:
+        """
+        Remove all pictures a predicate is true for.
+
+        The current picture stays current if it is kept, otherwise the
+        following kept picture becomes current.
+
+        Returns:
+            int: number of removed pictures
+        """
+        kept = array('I')
+        cursor = None
+        for index, picture in enumerate(self):
+            if predicate(picture):
+                continue
+            if cursor is None and index >= self._cursor:
+                cursor = len(kept)
+            kept.append(picture._row)
+
+        removed = len(self._rows) - len(kept)
+        if removed:
+            self._reset(kept, cursor or 0)
+        return removed
+
+    def index_of(self, picture) -> int:
+        """Return the index of a picture of the sequence, or -1."""
+        if picture._table is not self._table:
+            return -1
+        return self._index_of_row(picture._row)
+
+    def _index_of_row(self, row: int) -> int:
+        name = self._table.names[row]
+        index = bisect_left(self._names, name)
+        while index < len(self._names) and self._names[index] == name:
+            if self._rows[index] == row:
+                return index
+            index += 1
+        return -1
+
+    def _changed(self, row: int):
+        index = self._index_of_row(row)
+        if index < 0:
+            return
+
+        for name, test in self._filters.items():
+            if test(self._table, row):
+                self._bits[name] |= 1 << index
+            else:
+                self._bits[name] &= ~(1 << index)
+
+
+def _bitset(matches) -> int:
+    # build the integer from a string, setting the bits one by one would
+    # copy the integer for every bit
+    digits = ''.join('1' if match else '0' for match in matches)
+    return int(digits[::-1] or '0', 2)
+
+
+def _lowest_bit(bits: int) -> int:
+    return (bits & -bits).bit_length() - 1
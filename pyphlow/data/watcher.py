@@ -0,0 +1,278 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+
+# directories of a shoot which are watched for changes
+WATCHED_DIRECTORIES = ("src", "edit", "export")
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+
+_MASK = (_IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE
+         | _IN_DELETE | _IN_DELETE_SELF)
+
+_EVENT = struct.Struct('iIII')
+
+
+class Watcher(ABC):
+    """
+    Report changed files below a set of directories.
+
+    Changes are debounced: the callback is called once no further change has
+    happened for `delay` seconds, or at the latest after `max_delay` seconds,
+    with the set of all paths changed in the meantime. A burst of changes
+    therefore results in a single call.
+
+    The callback is called from the thread of the watcher.
+    """
+
+    def __init__(self,
+                 directories,
+                 callback,
+                 delay: float = .25,
+                 max_delay: float = 2.):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.callback = callback
+        self.delay = delay
+        self.max_delay = max_delay
+
+        self._changes = set()
+        self._first_change = None
+        self._last_change = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _changed(self, path: str):
+        now = time.monotonic()
+        if not self._changes:
+            self._first_change = now
+        self._last_change = now
+        self._changes.add(path)
+
+    def _timeout(self) -> float:
+        """Seconds until the pending changes are due."""
+        if not self._changes:
+            return self.delay
+        now = time.monotonic()
+        return max(
+            0.,
+            min(self._last_change + self.delay,
+                self._first_change + self.max_delay) - now)
+
+    def _flush(self):
+        if self._changes and self._timeout() == 0:
+            changes = self._changes
+            self._changes = set()
+            self.callback(changes)
+
+    @abstractmethod
+    def _run(self):
+        """Report changes until stopped, runs in the thread of the watcher."""
+
+
+class InotifyWatcher(Watcher):
+    """Watcher based on the inotify API of Linux."""
+
+    def __init__(self, directories, callback, **kwargs):
+        super().__init__(directories, callback, **kwargs)
+
+        self._libc = _libc()
+        if self._libc is None:
+            raise OSError("inotify is not available")
+
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self._watches = {}
+        for directory in self.directories:
+            self._watch_tree(directory)
+
+    def _watch(self, directory: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory),
+                                          _MASK)
+        if wd >= 0:
+            self._watches[wd] = directory
+
+    def _watch_tree(self, directory: str, report: bool = False):
+        for path, dirs, files in os.walk(directory):
+            self._watch(path)
+            if report:
+                for file in files:
+                    self._changed(os.path.join(path, file))
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                readable, _, _ = select.select([self._fd], [], [],
+                                               min(self._timeout(), .5))
+                if readable:
+                    self._read()
+                self._flush()
+        finally:
+            os.close(self._fd)
+
+    def _read(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length]
+            offset += _EVENT.size + length
+
+            if mask & _IN_Q_OVERFLOW:
+                # events were lost, everything may have changed
+                for directory in self.directories:
+                    self._changed(directory)
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & (_IN_IGNORED | _IN_DELETE_SELF):
+                if mask & _IN_IGNORED:
+                    del self._watches[wd]
+                continue
+
+            path = os.path.join(directory, os.fsdecode(name.rstrip(b'\0')))
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    self._watch_tree(path, report=True)
+                self._changed(path)
+            elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_MOVED_FROM
+                         | _IN_DELETE | _IN_CREATE):
+                self._changed(path)
+
+
+class PollingWatcher(Watcher):
+    """Watcher comparing the directory listings in regular intervals."""
+
+    def __init__(self, directories, callback, interval: float = 1.,
+                 **kwargs):
+        super().__init__(directories, callback, **kwargs)
+        self.interval = interval
+
+        # directory -> (mtime, file names, subdirectory names)
+        self._listings = {}
+        for directory in self.directories:
+            self._poll(directory, report=False)
+
+    def _list(self, directory: str):
+        files, dirs = set(), set()
+        with os.scandir(directory) as it:
+            for entry in it:
+                (dirs if entry.is_dir() else files).add(entry.name)
+        return files, dirs
+
+    def _poll(self, directory: str, report: bool = True):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            self._forget(directory, report)
+            return
+
+        old = self._listings.get(directory)
+        if old is not None and old[0] == mtime:
+            for subdir in old[2]:
+                self._poll(os.path.join(directory, subdir), report)
+            return
+
+        files, dirs = self._list(directory)
+        old_files, old_dirs = (old[1], old[2]) if old else (set(), set())
+        self._listings[directory] = (mtime, files, dirs)
+
+        if report:
+            for name in files ^ old_files:
+                self._changed(os.path.join(directory, name))
+        for name in old_dirs - dirs:
+            self._forget(os.path.join(directory, name), report)
+        for name in dirs:
+            self._poll(os.path.join(directory, name), report)
+
+    def _forget(self, directory: str, report: bool):
+        old = self._listings.pop(directory, None)
+        if old is None:
+            return
+        if report:
+            self._changed(directory)
+            for name in old[1]:
+                self._changed(os.path.join(directory, name))
+        for name in old[2]:
+            self._forget(os.path.join(directory, name), report)
+
+    def _run(self):
+        next_poll = time.monotonic()
+        while not self._stop.wait(
+                min(max(0., next_poll - time.monotonic()), self._timeout())):
+            if time.monotonic() >= next_poll:
+                for directory in self.directories:
+                    self._poll(directory)
+                next_poll = time.monotonic() + self.interval
+            self._flush()
+
+
+def _libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+                           use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32
+        ]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def watch(root: str, callback, **kwargs) -> Watcher:
+    """
+    Start watching the directories of a shoot.
+
+    inotify is used where available, otherwise the directories are polled.
+
+    Args:
+        root: root of the shoot
+        callback: called with a set of changed paths
+
+    Returns:
+        Watcher: the running watcher
+    """
+    directories = [
+        os.path.join(root, directory) for directory in WATCHED_DIRECTORIES
+        if os.path.isdir(os.path.join(root, directory))
+    ]
+
+    try:
+        watcher = InotifyWatcher(directories, callback, **kwargs)
+    except OSError:
+        watcher = PollingWatcher(directories, callback, **kwargs)
+
+    return watcher.start()
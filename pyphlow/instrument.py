@@ -0,0 +1,188 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+_enabled = False
+_lock = threading.Lock()
+
+_counters = {}
+_timers = {}
+_events = []
+
+_start = time.perf_counter()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+        _events.clear()
+
+
+def count(name: str, value: int = 1):
+    """Add to a counter."""
+    if not _enabled:
+        return
+
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def record(name: str, seconds: float, start: float = None, **args):
+    """
+    Record a duration.
+
+    Args:
+        name: name of the timer
+        seconds: measured duration
+        start: perf_counter() value at the start, used for the trace
+        args: additional values shown in the trace
+    """
+    if not _enabled:
+        return
+
+    if start is None:
+        start = time.perf_counter() - seconds
+
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = [0, 0., float("inf"), 0.]
+        timer[0] += 1
+        timer[1] += seconds
+        timer[2] = min(timer[2], seconds)
+        timer[3] = max(timer[3], seconds)
+
+        _events.append((name, start, seconds, threading.get_ident(), args))
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name,
+               time.perf_counter() - self.start, self.start, **self.args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **args):
+    """
+    Time a block of code.
+
+    Returns a shared no-op context manager while instrumentation is disabled.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def timed(name: str):
+    """Decorator timing every call of a function."""
+
+    def decorator(function):
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Span(name, {}):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def summary() -> dict:
+    """
+    Returns:
+        dict: counters and, for every timer, the number of calls and the
+            total, mean, minimum and maximum duration in seconds
+    """
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "timers": {
+                name: {
+                    "count": calls,
+                    "total": total,
+                    "mean": total / calls,
+                    "min": minimum,
+                    "max": maximum,
+                }
+                for name, (calls, total, minimum, maximum) in _timers.items()
+            },
+        }
+
+
+def dump_json(path: str):
+    with open(path, 'w') as f:
+        json.dump(summary(), f, indent=2)
+
+
+def dump_chrome_trace(path: str):
+    """Write all recorded durations in the Chrome trace event format."""
+    with _lock:
+        events = [{
+            "name": name,
+            "ph": "X",
+            "ts": (start - _start) * 1e6,
+            "dur": seconds * 1e6,
+            "pid": os.getpid(),
+            "tid": thread,
+            "args": args,
+        } for name, start, seconds, thread, args in _events]
+        counters = dict(_counters)
+
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": events, "otherData": counters}, f)
+
+
+# PYPHLOW_STATS and PYPHLOW_TRACE enable instrumentation and name the files
+# the summary and the Chrome trace are written to on exit
+_stats_path = os.environ.get("PYPHLOW_STATS")
+_trace_path = os.environ.get("PYPHLOW_TRACE")
+
+if _stats_path or _trace_path:
+    enable()
+    if _stats_path:
+        atexit.register(dump_json, _stats_path)
+    if _trace_path:
+        atexit.register(dump_chrome_trace, _trace_path)
@@ -0,0 +1,166 @@
+#! /usr/bin/env python3
+import argparse
+import os
+import sys
+
+from pyphlow import util
+from pyphlow.data.index import ShootIndex, split_name
+from pyphlow.data.journal import Journal
+from pyphlow.data.picturehandling import (Mode, Picture, can_apply,
+                                          plan_actions)
+
+DECISIONS = ("reject", "private", "keep")
+
+
+def read_decisions(path: str) -> dict:
+    """
+    Read a decision file.
+
+    Every line holds a decision and the name of a picture, e.g.
+    "reject DSC01234". File names are accepted as well, their extension is
+    ignored. Empty lines and lines starting with # are skipped, a later
+    decision for the same picture replaces an earlier one.
+
+    Returns:
+        dict: picture names mapped to their decision
+    """
+    decisions = {}
+    with open(path, 'r') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            decision, _, name = line.partition(' ')
+            name = name.strip()
+            if decision not in DECISIONS or not name:
+                raise ValueError(
+                    f"{path}:{number}: invalid decision {line!r}")
+            decisions[split_name(os.path.basename(name))[0]] = decision
+
+    return decisions
+
+
+def _edit_versions(root: str, name: str, edit_dirs: set) -> list:
+    if name not in edit_dirs:
+        return []
+
+    edit_path = os.path.join(root, "edit")
+    moves = []
+    for path, dirs, files in os.walk(os.path.join(edit_path, name)):
+        for file in files:
+            old_path = os.path.join(path, file)
+            moves.append((old_path,
+                          os.path.join(root, "rejected", "edit",
+                                       os.path.relpath(old_path, edit_path))))
+    return moves
+
+
+def plan(root: str, decisions: dict) -> tuple:
+    """
+    Plan the moves needed to apply decisions to a shoot.
+
+    The src and edit directories are scanned once. Rejected pictures leave
+    with their jpg, raw files, sidecars and edited versions, private
+    pictures move their jpg to export/private and the rest to rejected.
+
+    Returns:
+        tuple: list of moves as tuples of old and new path, and a list of
+            skipped pictures as tuples of name and reason
+    """
+    root = os.path.abspath(root)
+    index = ShootIndex.scan(os.path.join(root, "src"))
+    try:
+        edit_dirs = {
+            entry.name
+            for entry in os.scandir(os.path.join(root, "edit"))
+            if entry.is_dir()
+        }
+    except FileNotFoundError:
+        edit_dirs = set()
+
+    pictures = []
+    skipped = []
+    for name, decision in sorted(decisions.items()):
+        if decision == "keep":
+            continue
+        if name not in index and name not in edit_dirs:
+            skipped.append((name, "not part of the shoot"))
+            continue
+
+        picture = Picture(name, "", Mode.CATEGORIZING)
+        if decision == "reject":
+            picture.reject()
+        else:
+            picture.make_private()
+        if not can_apply(root, picture, index):
+            skipped.append((name, "no jpg to make private"))
+            continue
+        pictures.append(picture)
+
+    moves = plan_actions(root, pictures, index)
+    for picture in pictures:
+        if picture.action == "reject":
+            moves.extend(_edit_versions(root, picture.name, edit_dirs))
+
+    return moves, skipped
+
+
+def _print_moves(root: str, moves):
+    for old_path, new_path in moves:
+        print(f"{os.path.relpath(old_path, root)} -> "
+              f"{os.path.relpath(new_path, root)}")
+
+
+def main(root: str,
+         decisions_path: str,
+         dry_run: bool = False,
+         workers: int = 8):
+    root = os.path.abspath(root)
+    journal = Journal(root, workers)
+
+    # finish the moves of an interrupted run first, a dry run only lists them
+    if dry_run:
+        pending = journal.pending()
+        if pending:
+            print(f"Would complete {len(pending)} moves of an interrupted "
+                  f"run first:")
+            _print_moves(root, pending)
+    else:
+        recovered = journal.recover()
+        if recovered:
+            print(f"Completed {len(recovered)} moves of an interrupted run")
+
+    moves, skipped = plan(root, read_decisions(decisions_path))
+    for name, reason in skipped:
+        print(f"Skipped {name}: {reason}")
+
+    if dry_run:
+        _print_moves(root, moves)
+        return
+
+    journal.run(moves, util.print_progress)
+    if moves:
+        print()
+    print(f"Moved {len(moves)} files")
+
+
+def cli(args):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyphlow apply",
+        description="Apply a file of decisions to a shoot.")
+    parser.add_argument("root", help="root of the shoot")
+    parser.add_argument("decisions",
+                        help="file with lines like 'reject NAME', "
+                        "'private NAME' or 'keep NAME'")
+    parser.add_argument("-n", "--dry-run", action="store_true",
+                        help="only print the planned moves")
+    parser.add_argument("-j", "--workers", type=int, default=8,
+                        help="number of files moved at the same time")
+    args = parser.parse_args(args)
+
+    main(args.root, args.decisions, args.dry_run, args.workers)
+
+
+if __name__ == '__main__':
+    cli(sys.argv[1:])
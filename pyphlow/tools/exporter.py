@@ -0,0 +1,302 @@
+#! /usr/bin/env python3
+import argparse
+import json
+import os
+import sys
+from typing import NamedTuple
+
+from pyphlow import util
+from pyphlow.data.catalog import CATALOG_DIR
+from pyphlow.data.picturehandling import displayable, public_index
+
+MANIFEST_NAME = "export.json"
+PRESETS_NAME = "presets.json"
+
+VISIBILITIES = ("public", "private")
+
+
+class Preset(NamedTuple):
+    """Size and quality pictures are exported with."""
+    name: str
+    # longest edge in pixels, 0 keeps the original size
+    long_edge: int = 0
+    quality: int = 90
+    # remove the EXIF data of public exports, e.g. location and camera
+    strip_public_exif: bool = True
+
+
+DEFAULT_PRESETS = (
+    Preset("web", 2048, 85),
+    Preset("full", 0, 95),
+)
+
+
+def load_presets(root: str) -> tuple:
+    """
+    Load the presets of a shoot.
+
+    Presets are read from a JSON list of objects with the fields of Preset in
+    the catalog directory of the shoot, the default presets are used if
+    there is none.
+    """
+    try:
+        with open(os.path.join(root, CATALOG_DIR, PRESETS_NAME), 'r') as f:
+            return tuple(Preset(**preset) for preset in json.load(f))
+    except FileNotFoundError:
+        return DEFAULT_PRESETS
+
+
+def render(source: str, target: str, long_edge: int, quality: int,
+           strip_exif: bool):
+    """
+    Render a picture for export.
+
+    The picture is rotated according to its EXIF orientation, scaled down to
+    the longest edge and written as JPEG. The EXIF data is kept, with the
+    orientation reset, unless it is stripped.
+    """
+    from PIL import Image as PILImage
+    from PIL import ImageOps
+
+    with PILImage.open(source) as img:
+        if long_edge:
+            img.draft('RGB', (long_edge, long_edge))
+        exif = img.getexif()
+        icc_profile = img.info.get('icc_profile')
+
+        picture = ImageOps.exif_transpose(img).convert('RGB')
+
+    if long_edge:
+        picture.thumbnail((long_edge, long_edge), PILImage.LANCZOS)
+
+    options = {"quality": quality, "optimize": True}
+    if icc_profile:
+        options["icc_profile"] = icc_profile
+    if not strip_exif:
+        exif[0x0112] = 1
+        options["exif"] = exif.tobytes()
+
+    with util.atomic_write(target) as f:
+        picture.save(f, "JPEG", **options)
+
+
+class Exporter:
+    """
+    Export the pictures of a shoot in the sizes of a set of presets.
+
+    The pictures in export/public and export/private and all edited versions
+    are rendered to export/<visibility>/<preset>/. Edited versions are
+    public if their picture is. Every output is recorded in a manifest with
+    the mtime, size and checksum of its source and the preset, so only new
+    or changed pictures are rendered again. Outputs of pictures which have
+    been removed are deleted.
+    """
+
+    def __init__(self, root: str, presets=None, workers: int = None):
+        """
+        Args:
+            root: root of the shoot
+            presets: presets to export, those of the shoot if not given
+            workers: number of processes rendering pictures
+        """
+        self.root = os.path.abspath(root)
+        self.presets = tuple(presets or load_presets(self.root))
+        self.workers = workers
+
+        self._manifest_path = os.path.join(self.root, CATALOG_DIR,
+                                           MANIFEST_NAME)
+        try:
+            with open(self._manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.manifest = {}
+
+    def sources(self) -> dict:
+        """
+        Returns:
+            dict: paths of the pictures to export mapped to their visibility
+        """
+        export_path = os.path.join(self.root, "export")
+        sources = {}
+        public = frozenset()
+        for visibility in VISIBILITIES:
+            directory = os.path.join(export_path, visibility)
+            try:
+                with os.scandir(directory) as it:
+                    files = [entry.name for entry in it if entry.is_file()]
+            except FileNotFoundError:
+                continue
+            if visibility == "public":
+                public = public_index(files)
+            for file in files:
+                if displayable(file):
+                    sources[os.path.join(directory, file)] = visibility
+
+        edit_path = os.path.join(self.root, "edit")
+        for path, dirs, files in os.walk(edit_path):
+            name = os.path.relpath(path, edit_path).split(os.sep)[0]
+            visibility = "public" if name in public else "private"
+            for file in files:
+                if displayable(file):
+                    sources[os.path.join(path, file)] = visibility
+
+        return sources
+
+    def _target(self, source: str, visibility: str, preset: Preset) -> str:
+        stem = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(self.root, "export", visibility, preset.name,
+                            f"{stem}.jpg")
+
+    def _is_current(self, target: str, source: str, stat, preset: Preset,
+                    strip_exif: bool) -> bool:
+        entry = self.manifest.get(os.path.relpath(target, self.root))
+        if entry is None or not os.path.exists(target):
+            return False
+        if entry["preset"] != [preset.long_edge, preset.quality, strip_exif]:
+            return False
+        if entry["source"] != os.path.relpath(source, self.root):
+            return False
+        if entry["size"] != stat.st_size:
+            return False
+        if entry["mtime"] == stat.st_mtime_ns:
+            return True
+
+        # touched but maybe not changed, compare the content
+        if entry["sha256"] == util.checksum(source):
+            entry["mtime"] = stat.st_mtime_ns
+            return True
+        return False
+
+    def plan(self) -> list:
+        """
+        List the outputs which are missing or outdated.
+
+        Returns:
+            list: tuples of source, target, preset and whether to strip the
+                EXIF data
+        """
+        jobs = {}
+        # edited versions come last and replace pictures of the same name
+        for source, visibility in self.sources().items():
+            stat = os.stat(source)
+            for preset in self.presets:
+                strip_exif = (preset.strip_public_exif
+                              and visibility == "public")
+                target = self._target(source, visibility, preset)
+                if self._is_current(target, source, stat, preset,
+                                    strip_exif):
+                    jobs.pop(target, None)
+                else:
+                    jobs[target] = (source, target, preset, strip_exif)
+
+        return list(jobs.values())
+
+    def prune(self) -> list:
+        """
+        Delete the outputs of pictures which are no longer exported.
+
+        Only the outputs of the presets of the exporter are considered.
+
+        Returns:
+            list: paths of the deleted outputs
+        """
+        sources = self.sources()
+        expected = {
+            os.path.relpath(self._target(source, visibility, preset),
+                            self.root)
+            for source, visibility in sources.items()
+            for preset in self.presets
+        }
+
+        names = {preset.name for preset in self.presets}
+
+        deleted = []
+        for target in list(self.manifest):
+            # export/<visibility>/<preset>/<file>
+            if target in expected or target.split(os.sep)[2] not in names:
+                continue
+            path = os.path.join(self.root, target)
+            if os.path.exists(path):
+                os.unlink(path)
+                deleted.append(path)
+            del self.manifest[target]
+
+        return deleted
+
+    def run(self, progress=None) -> int:
+        """
+        Export all new or changed pictures.
+
+        Args:
+            progress: function called with the number of rendered and total
+                pictures after every rendered picture
+
+        Returns:
+            int: number of rendered pictures
+        """
+        try:
+            self.prune()
+            jobs = self.plan()
+            self._run(jobs, progress)
+        finally:
+            util.save_json(self._manifest_path, self.manifest)
+
+        return len(jobs)
+
+    def _run(self, jobs, progress):
+        from concurrent.futures import ProcessPoolExecutor
+
+        checksums = {}
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [(executor.submit(render, source, target,
+                                        preset.long_edge, preset.quality,
+                                        strip_exif), source, target, preset,
+                        strip_exif)
+                       for source, target, preset, strip_exif in jobs]
+
+            for done, (future, source, target, preset,
+                       strip_exif) in enumerate(futures, 1):
+                future.result()
+                stat = os.stat(source)
+                if source not in checksums:
+                    checksums[source] = util.checksum(source)
+                self.manifest[os.path.relpath(target, self.root)] = {
+                    "source": os.path.relpath(source, self.root),
+                    "mtime": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "sha256": checksums[source],
+                    "preset": [preset.long_edge, preset.quality, strip_exif],
+                }
+                if progress is not None:
+                    progress(done, len(jobs))
+
+
+
+def main(root: str, preset_names=None, workers: int = None):
+    presets = load_presets(root)
+    if preset_names:
+        presets = [preset for preset in presets if preset.name in preset_names]
+
+    exporter = Exporter(root, presets, workers)
+    rendered = exporter.run(util.print_progress)
+    if rendered:
+        print()
+    print(f"Exported {rendered} pictures of {exporter.root}")
+
+
+def cli(args):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyphlow export",
+        description="Export the pictures of a shoot in the sizes of presets.")
+    parser.add_argument("root", help="root of the shoot")
+    parser.add_argument("-p", "--preset", action="append", dest="presets",
+                        help="only export this preset, may be repeated")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of pictures rendered at the same time")
+    args = parser.parse_args(args)
+
+    main(args.root, args.presets, args.workers)
+
+
+if __name__ == '__main__':
+    cli(sys.argv[1:])
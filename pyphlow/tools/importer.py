@@ -0,0 +1,270 @@
+#! /usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from pyphlow import util
+from pyphlow.data.catalog import CATALOG_DIR
+from pyphlow.data.index import (JPG_EXTENSIONS, RAW_EXTENSIONS,
+                                SIDECAR_EXTENSIONS, split_name)
+from pyphlow.data.previews import PreviewCache, generate_preview
+from pyphlow.data.raw import extract_preview, raw_preview_path
+
+MANIFEST_NAME = "import.json"
+
+
+def target_directory(file_name: str):
+    """
+    Return the directory below src a file from a camera belongs into.
+
+    Returns:
+        str: name of the directory, or None if the file is not imported
+    """
+    name, ext = split_name(file_name)
+    if ext in JPG_EXTENSIONS:
+        return "jpg"
+    if ext in RAW_EXTENSIONS:
+        return ext.lower()
+    if ext.endswith(SIDECAR_EXTENSIONS):
+        # NAME.ARW.xmp belongs next to NAME.ARW
+        raw_ext = ext.rpartition('.')[0]
+        return raw_ext.lower() if raw_ext in RAW_EXTENSIONS else "xmp"
+    return None
+
+
+def copy_file(source: str, target: str) -> tuple:
+    """
+    Copy a file and compute its checksum on the way.
+
+    The file is written to a temporary name first, so an interrupted import
+    leaves no partial files behind.
+
+    Returns:
+        tuple: SHA-256 checksum and size of the file
+    """
+    checksum = hashlib.sha256()
+    size = 0
+
+    with open(source, 'rb') as src, util.atomic_write(target) as dst:
+        while True:
+            chunk = src.read(util.CHUNK_SIZE)
+            if not chunk:
+                break
+            checksum.update(chunk)
+            dst.write(chunk)
+            size += len(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+
+        stat = os.stat(source)
+        if size != stat.st_size:
+            raise OSError(f"Short copy of {source}")
+        os.utime(dst.name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    return checksum.hexdigest(), size
+
+
+class Importer:
+    """
+    Import pictures from a camera card into a shoot.
+
+    Files are copied by a bounded pool of threads and checksummed while they
+    are copied. Files which are already part of the shoot, or were imported
+    before according to the manifest of the shoot, are skipped. While
+    the copies are running, previews are generated in a process pool, so the
+    shoot can be culled as soon as the import is finished.
+    """
+
+    def __init__(self,
+                 root: str,
+                 copy_workers: int = 4,
+                 preview_workers: int = None,
+                 verify: bool = False):
+        """
+        Args:
+            root: root of the shoot
+            copy_workers: number of files copied at the same time
+            preview_workers: number of processes generating previews
+            verify: read every copy again and compare its checksum
+        """
+        self.root = os.path.abspath(root)
+        self.copy_workers = copy_workers
+        self.preview_workers = preview_workers
+        self.verify = verify
+
+        self._manifest_path = os.path.join(self.root, CATALOG_DIR,
+                                           MANIFEST_NAME)
+        try:
+            with open(self._manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.manifest = {}
+
+        # files of the card which exist in the shoot with different content
+        self.conflicts = []
+
+    def plan(self, card: str) -> list:
+        """
+        List the files of a card which are not part of the shoot yet.
+
+        Returns:
+            list: tuples of source and target path
+        """
+        candidates = []
+        for path, dirs, names in os.walk(card):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for name in names:
+                directory = target_directory(name)
+                if directory is None or name.startswith('.'):
+                    continue
+                candidates.append((os.path.join(path, name),
+                                   os.path.join(self.root, "src", directory,
+                                                name)))
+
+        files = []
+        # files already in the shoot are read to compare their checksums
+        with ThreadPoolExecutor(max_workers=self.copy_workers) as pool:
+            for paths, duplicate in zip(candidates,
+                                        pool.map(self._check, candidates)):
+                if duplicate is None:
+                    self.conflicts.append(paths)
+                elif not duplicate:
+                    files.append(paths)
+
+        return sorted(files, key=lambda paths: os.path.basename(paths[0]))
+
+    def _check(self, paths):
+        try:
+            return self._is_duplicate(*paths)
+        except FileExistsError:
+            return None
+
+    def _is_duplicate(self, source: str, target: str) -> bool:
+        """
+        Check whether a file of the card has been imported before.
+
+        Camera file numbers wrap around, so a file with the same name and
+        size is only a duplicate if its checksum matches as well.
+
+        Raises:
+            FileExistsError: if a different file was imported under the name
+        """
+        imported = self.manifest.get(os.path.relpath(target, self.root))
+        try:
+            size = os.path.getsize(target)
+        except FileNotFoundError:
+            # imported before and moved out of src while culling
+            if imported is None:
+                return False
+            size = imported["size"]
+            checksum = imported["sha256"]
+        else:
+            checksum = None
+            if imported is not None and imported["size"] == size:
+                checksum = imported["sha256"]
+
+        if size == os.path.getsize(source):
+            if checksum is None:
+                checksum = util.checksum(target)
+            if checksum == util.checksum(source):
+                return True
+
+        raise FileExistsError(
+            f"{target} already exists with different content")
+
+    def run(self, card: str, progress=None) -> dict:
+        """
+        Import all new files of a card.
+
+        Args:
+            card: directory of the card
+            progress: function called with the number of copied and total
+                files after every copy
+
+        Returns:
+            dict: relative paths of the imported files mapped to checksums
+        """
+        files = self.plan(card)
+        for directory in {os.path.dirname(target) for _, target in files}:
+            os.makedirs(directory, exist_ok=True)
+
+        imported = {}
+        try:
+            self._run(files, imported, progress)
+        finally:
+            # the checksums of finished copies are kept even if one failed
+            util.save_json(self._manifest_path, self.manifest)
+
+        return imported
+
+    def _copy(self, paths):
+        source, target = paths
+        checksum, size = copy_file(source, target)
+        if self.verify and util.checksum(target) != checksum:
+            os.unlink(target)
+            raise OSError(f"Checksum mismatch for {target}")
+        return target, checksum, size
+
+    def _run(self, files, imported, progress):
+        from concurrent.futures import ProcessPoolExecutor
+
+        previews = PreviewCache(self.root)
+        preview_jobs = []
+        jpg_names = {
+            split_name(os.path.basename(target))[0]
+            for _, target in files
+            if split_name(os.path.basename(target))[1] in JPG_EXTENSIONS
+        }
+
+        with ProcessPoolExecutor(max_workers=self.preview_workers) as pool, \
+                ThreadPoolExecutor(max_workers=self.copy_workers) as copiers:
+            for target, checksum, size in copiers.map(self._copy, files):
+                relative = os.path.relpath(target, self.root)
+                imported[relative] = checksum
+                self.manifest[relative] = {"sha256": checksum, "size": size}
+
+                name, ext = split_name(os.path.basename(target))
+                if ext in JPG_EXTENSIONS:
+                    preview_jobs.append(
+                        pool.submit(generate_preview, target,
+                                    previews.path_for(target), previews.size,
+                                    previews.quality))
+                elif ext in RAW_EXTENSIONS and name not in jpg_names:
+                    preview_jobs.append(
+                        pool.submit(extract_preview, target,
+                                    raw_preview_path(self.root, name)))
+
+                if progress is not None:
+                    progress(len(imported), len(files))
+
+            for job in preview_jobs:
+                # a missing preview is generated again when it is viewed
+                job.exception()
+
+
+
+def main(card: str, root: str):
+    importer = Importer(root)
+    imported = importer.run(card, util.print_progress)
+    print(f"\nImported {len(imported)} files into {os.path.abspath(root)}")
+
+    for source, target in importer.conflicts:
+        print(f"Skipped {source}: {target} exists with different content")
+
+
+def cli(args):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyphlow import",
+        description="Copy the pictures of a memory card into a shoot.")
+    parser.add_argument("card", help="directory of the memory card")
+    parser.add_argument("root", help="root of the shoot")
+    args = parser.parse_args(args)
+
+    main(args.card, args.root)
+
+
+if __name__ == '__main__':
+    cli(sys.argv[1:])
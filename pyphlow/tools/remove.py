@@ -1,22 +1,36 @@
 #! /usr/bin/env python3
+import argparse
 import os
 import sys
 
+from pyphlow.data.index import split_name
+from pyphlow.data.journal import Journal
+from pyphlow.tools.apply import plan
+
 
 def main(root: str):
     with open(os.path.join(root, "rejected.txt"), 'r') as f:
-        rejected_files = f.read().splitlines()
+        rejected_files = [line for line in f.read().splitlines() if line]
+
+    # reject the whole picture of every listed file, like apply does
+    names = {split_name(os.path.basename(file))[0] for file in rejected_files}
+    moves, skipped = plan(root, dict.fromkeys(names, "reject"))
+    for name, reason in skipped:
+        print(f"Skipped {name}: {reason}")
+
+    Journal(root).run(moves)
+    print(f"Moved {len(moves)} files")
+
 
-    print(rejected_files)
+def cli(args):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyphlow remove",
+        description="Reject the pictures listed in rejected.txt of a shoot.")
+    parser.add_argument("root", help="root of the shoot")
+    args = parser.parse_args(args)
 
-    for file in rejected_files:
-        old_path = os.path.join(root, file)
-        new_path = os.path.join(root, f"9rejected/{file}")
-        if os.path.exists(old_path):
-            os.makedirs(os.path.dirname(new_path), exist_ok=True)
-            os.rename(old_path, new_path)
+    main(args.root)
 
 
 if __name__ == '__main__':
-    print(sys.argv[0], sys.argv[1])
-    main(sys.argv[1])
+    cli(sys.argv[1:])
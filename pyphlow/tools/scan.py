@@ -0,0 +1,48 @@
+#! /usr/bin/env python3
+import argparse
+import sys
+
+from pyphlow.data.library import Library
+from pyphlow.data.picturehandling import Mode
+
+
+def main(roots, modes=None, workers: int = 8):
+    """
+    Scan shoots and store their picture lists in their catalogs.
+
+    Args:
+        roots: roots of the shoots, scanned concurrently
+        modes: modes to scan, all if not given
+        workers: number of shoots opened at the same time
+    """
+    for mode in modes or Mode:
+        with Library(roots, mode, workers) as library:
+            for root in library.roots:
+                prefix = f"{root} " if len(library.roots) > 1 else ""
+                pictures = library.pictures(root)
+                if pictures is None:
+                    print(f"{prefix}{mode.name}: missing directories")
+                    continue
+                print(f"{prefix}{mode.name}: {len(pictures)} pictures")
+
+
+def cli(args):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyphlow scan",
+        description="Scan shoots and store their picture lists in their "
+        "catalogs.")
+    parser.add_argument("roots", nargs="+", metavar="root",
+                        help="root of a shoot")
+    parser.add_argument("-m", "--mode", action="append", dest="modes",
+                        choices=[mode.name.lower() for mode in Mode],
+                        help="only scan this mode, may be repeated")
+    parser.add_argument("-j", "--workers", type=int, default=8,
+                        help="number of shoots opened at the same time")
+    args = parser.parse_args(args)
+
+    main(args.roots, [Mode[mode.upper()] for mode in args.modes or ()],
+         args.workers)
+
+
+if __name__ == '__main__':
+    cli(sys.argv[1:])
@@ -0,0 +1,40 @@
+#! /usr/bin/env python3
+import argparse
+import os
+import sys
+
+from pyphlow.data.catalog import Catalog
+from pyphlow.data.picturehandling import Mode, load_pictures
+from pyphlow.data.previews import PreviewCache
+
+
+def main(root: str):
+    root = os.path.abspath(root)
+
+    sources = set()
+    with Catalog(root) as catalog:
+        for mode in Mode:
+            try:
+                pictures = load_pictures(root, mode, catalog)
+            except FileNotFoundError:
+                continue
+            sources.update(picture.preview for picture in pictures
+                           if picture.preview)
+
+    generated = PreviewCache(root).warm(sorted(sources))
+    print(f"Generated {generated} of {len(sources)} previews")
+
+
+def cli(args):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyphlow warm",
+        description="Scan a shoot and generate its previews ahead of "
+        "viewing.")
+    parser.add_argument("root", help="root of the shoot")
+    args = parser.parse_args(args)
+
+    main(args.root)
+
+
+if __name__ == '__main__':
+    cli(sys.argv[1:])
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+# bytes read at once when copying or hashing files
+CHUNK_SIZE = 1024 * 1024
+
+
+def checksum(path: str) -> str:
+    """Return the SHA-256 checksum of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def atomic_write(target: str, mode: str = 'wb'):
+    """
+    Open a file that replaces target once it has been written completely.
+
+    The file is written under a hidden temporary name next to target, so
+    readers never see a partial file and an interrupted write leaves nothing
+    behind.
+
+    Args:
+        target: path of the file
+        mode: mode the temporary file is opened with
+    """
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    # unique per process and thread, unlike mkstemp() the file gets the
+    # permissions of a file created by open()
+    tmp = os.path.join(
+        directory, f".{os.path.basename(target)}.{os.getpid()}."
+        f"{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, mode) as f:
+            yield f
+        os.replace(tmp, target)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def save_json(path: str, data):
+    """Write data to a JSON file, replacing it atomically."""
+    with atomic_write(path, 'w') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+
+def print_progress(done: int, total: int):
+    """Show the progress of a command on a single terminal line."""
+    print(f"\r{done}/{total}", end="", flush=True)
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from benchmarks.shoot import generate
+
+
+@pytest.fixture
+def make_shoot(tmp_path):
+    """Return a function generating a synthetic shoot below tmp_path."""
+
+    def make(name: str = "shoot", count: int = 5, **kwargs) -> str:
+        root = str(tmp_path / name)
+        kwargs.setdefault("raw_only", 0)
+        kwargs.setdefault("edited", 0)
+        kwargs.setdefault("public", 0)
+        kwargs.setdefault("private", 0)
+        generate(root, count, **kwargs)
+        return root
+
+    return make
+
+
+@pytest.fixture
+def shoot(make_shoot) -> str:
+    return make_shoot()
+
+
+def files(root: str, directory: str) -> list:
+    """Return the sorted file names in a directory of a shoot."""
+    path = os.path.join(root, directory)
+    if not os.path.isdir(path):
+        return []
+    return sorted(os.listdir(path))
@@ -0,0 +1,59 @@
+import os
+
+from pyphlow.data.journal import Journal
+from pyphlow.tools import apply
+
+from tests.conftest import files
+
+
+def _decisions(tmp_path, text: str) -> str:
+    path = tmp_path / "decisions.txt"
+    path.write_text(text)
+    return str(path)
+
+
+def _interrupt(root: str, moves):
+    # a journal of moves which were planned but never executed
+    journal = Journal(root)
+    os.makedirs(journal.directory, exist_ok=True)
+    journal._write(os.path.join(journal.directory, "1.pending"), moves)
+    return journal
+
+
+def test_apply(shoot, tmp_path):
+    decisions = _decisions(tmp_path, "reject DSC00001\nprivate DSC00002.JPG\n")
+
+    apply.main(shoot, decisions)
+
+    assert files(shoot, "rejected/src/jpg") == ["DSC00001.JPG"]
+    assert files(shoot, "export/private") == ["DSC00002.JPG"]
+
+
+def test_dry_run_does_not_move_files(shoot, tmp_path, capsys):
+    old = os.path.join(shoot, "src", "jpg", "DSC00003.JPG")
+    new = os.path.join(shoot, "rejected", "src", "jpg", "DSC00003.JPG")
+    journal = _interrupt(shoot, [(old, new)])
+    decisions = _decisions(tmp_path, "reject DSC00001\n")
+
+    apply.main(shoot, decisions, dry_run=True)
+
+    assert "DSC00001.JPG" in files(shoot, "src/jpg")
+    assert "DSC00003.JPG" in files(shoot, "src/jpg")
+    assert journal.pending() == [(old, new)]
+    out = capsys.readouterr().out
+    assert "Would complete 1 moves" in out
+    assert "src/jpg/DSC00003.JPG -> rejected/src/jpg/DSC00003.JPG" in out
+
+    apply.main(shoot, decisions)
+
+    assert files(shoot, "rejected/src/jpg") == ["DSC00001.JPG", "DSC00003.JPG"]
+    assert journal.pending() == []
+
+
+def test_raw_only_private_is_skipped(shoot, tmp_path, capsys):
+    os.remove(os.path.join(shoot, "src", "jpg", "DSC00001.JPG"))
+
+    apply.main(shoot, _decisions(tmp_path, "private DSC00001\n"))
+
+    assert "Skipped DSC00001: no jpg to make private" in capsys.readouterr().out
+    assert "DSC00001.ARW" in files(shoot, "src/arw")
@@ -0,0 +1,115 @@
+import os
+import time
+
+from pyphlow.data import catalog
+from pyphlow.data.catalog import Catalog
+
+
+def _age(path, seconds: int = 3600) -> int:
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+    return os.stat(path).st_mtime_ns
+
+
+def _add(directory, name: str, mtime: int = None):
+    # adds a file, keeping the mtime of the directory if given
+    (directory / name).write_bytes(b"")
+    if mtime is not None:
+        os.utime(directory, ns=(mtime, mtime))
+
+
+def test_trusted_mtime():
+    now = time.time_ns()
+    old = now - (catalog._RACY_WINDOW + 1) * 10**9
+
+    assert catalog._trusted_mtime(old) == old
+    assert catalog._trusted_mtime(now) == -1
+
+
+def test_scandir_is_served_until_mtime_changes(tmp_path):
+    directory = tmp_path / "src"
+    directory.mkdir()
+    _add(directory, "a.jpg")
+    mtime = _age(directory)
+
+    with Catalog(str(tmp_path)) as shoot:
+        assert shoot.listdir(str(directory)) == ["a.jpg"]
+
+        # the listing is not read again while the mtime is the same
+        _add(directory, "b.jpg", mtime)
+        assert shoot.listdir(str(directory)) == ["a.jpg"]
+
+        _age(directory, 1800)
+        assert shoot.listdir(str(directory)) == ["a.jpg", "b.jpg"]
+
+
+def test_scandir_does_not_trust_recent_mtime(tmp_path):
+    directory = tmp_path / "src"
+    directory.mkdir()
+    _add(directory, "a.jpg")
+    mtime = os.stat(directory).st_mtime_ns
+
+    with Catalog(str(tmp_path)) as shoot:
+        assert shoot.listdir(str(directory)) == ["a.jpg"]
+
+        # a change within the resolution of the mtime is still seen
+        _add(directory, "b.jpg", mtime)
+        assert shoot.listdir(str(directory)) == ["a.jpg", "b.jpg"]
+
+
+def test_load_until_dependency_changes(tmp_path):
+    directory = tmp_path / "src"
+    directory.mkdir()
+    _age(directory)
+    pictures = [("a", str(directory / "a.jpg"), True), ("b", "", False)]
+
+    with Catalog(str(tmp_path)) as shoot:
+        assert shoot.load("CATEGORIZING") is None
+
+        with shoot.record() as dependencies:
+            shoot.scandir(str(directory))
+        shoot.store("CATEGORIZING", pictures, dependencies)
+
+        assert list(shoot.load("CATEGORIZING")) == pictures
+        assert shoot.load("EDITING") is None
+
+        _add(directory, "c.jpg")
+        assert shoot.load("CATEGORIZING") is None
+
+
+def test_load_does_not_trust_recent_dependency(tmp_path):
+    directory = tmp_path / "src"
+    directory.mkdir()
+
+    with Catalog(str(tmp_path)) as shoot:
+        with shoot.record() as dependencies:
+            shoot.scandir(str(directory))
+        shoot.store("CATEGORIZING", [("a", "", False)], dependencies)
+
+        assert shoot.load("CATEGORIZING") is None
+
+
+def test_catalog_persists(tmp_path):
+    directory = tmp_path / "src"
+    directory.mkdir()
+    _age(directory)
+
+    with Catalog(str(tmp_path)) as shoot:
+        with shoot.record() as dependencies:
+            shoot.scandir(str(directory))
+        shoot.store("VIEW_ALL", [("a", "", False)], dependencies)
+
+    with Catalog(str(tmp_path)) as shoot:
+        assert list(shoot.load("VIEW_ALL")) == [("a", "", False)]
+
+
+def test_features_follow_mtime(tmp_path):
+    path = str(tmp_path / "a.jpg")
+    old = time.time_ns() - 10 * 10**9
+
+    with Catalog(str(tmp_path)) as shoot:
+        shoot.store_features("hash", [(path, old, [1, 2])])
+
+        assert shoot.load_features("hash", {path: old}) == {path: [1, 2]}
+        assert shoot.load_features("hash", {path: old + 1}) == {}
+        assert shoot.load_features("sharpness", {path: old}) == {}
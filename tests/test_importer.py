@@ -0,0 +1,32 @@
+import json
+import os
+
+from benchmarks.shoot import make_jpeg, make_raw
+from pyphlow.tools.importer import Importer
+
+from tests.conftest import files
+
+
+def _card(path) -> str:
+    dcim = path / "DCIM" / "100MSDCF"
+    dcim.mkdir(parents=True)
+    for name in ("DSC00000", "DSC00001"):
+        (dcim / f"{name}.JPG").write_bytes(make_jpeg())
+        (dcim / f"{name}.ARW").write_bytes(make_raw(1, make_jpeg()))
+    return str(path)
+
+
+def test_import(tmp_path):
+    card = _card(tmp_path / "card")
+    root = str(tmp_path / "shoot")
+
+    imported = Importer(root, preview_workers=1).run(card)
+
+    assert len(imported) == 4
+    assert files(root, "src/jpg") == ["DSC00000.JPG", "DSC00001.JPG"]
+    assert files(root, "src/arw") == ["DSC00000.ARW", "DSC00001.ARW"]
+    with open(os.path.join(root, ".pyphlow", "import.json")) as f:
+        assert len(json.load(f)) == 4
+
+    # imported files are skipped the next time
+    assert not Importer(root, preview_workers=1).run(card)
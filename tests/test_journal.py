@@ -0,0 +1,76 @@
+import os
+
+from pyphlow.data import journal
+from pyphlow.data.journal import Journal
+
+
+def _files(tmp_path, count: int = 3) -> list:
+    moves = []
+    for i in range(count):
+        old = tmp_path / "a" / f"{i}.jpg"
+        old.parent.mkdir(exist_ok=True)
+        old.write_bytes(b"%d" % i)
+        moves.append((str(old), str(tmp_path / "b" / f"{i}.jpg")))
+    return moves
+
+
+def test_run_and_undo(tmp_path):
+    moves = _files(tmp_path)
+    log = Journal(str(tmp_path))
+
+    assert log.run(moves) == moves
+    assert sorted(os.listdir(tmp_path / "b")) == ["0.jpg", "1.jpg", "2.jpg"]
+    assert os.listdir(tmp_path / "a") == []
+
+    assert log.undo() == [(new, old) for old, new in moves]
+    assert sorted(os.listdir(tmp_path / "a")) == ["0.jpg", "1.jpg", "2.jpg"]
+    assert os.listdir(tmp_path / "b") == []
+    assert os.listdir(log.directory) == []
+    assert log.undo() == []
+
+
+def test_undo_goes_back_batch_by_batch(tmp_path):
+    first, second = _files(tmp_path, 2)
+    log = Journal(str(tmp_path))
+    log.run([first])
+    log.run([second])
+
+    assert log.undo() == [second[::-1]]
+    assert os.path.exists(first[1])
+    assert os.path.exists(second[0])
+
+    assert log.undo() == [first[::-1]]
+    assert os.path.exists(first[0])
+
+
+def test_recover_completes_interrupted_batch(tmp_path):
+    moves = _files(tmp_path)
+    log = Journal(str(tmp_path))
+    os.makedirs(log.directory)
+    log._write(os.path.join(log.directory, "1.pending"), moves)
+    # the first move was done before the interruption
+    os.makedirs(tmp_path / "b")
+    os.rename(*moves[0])
+
+    assert log.pending() == moves
+    assert log.recover() == moves
+    assert log.pending() == []
+    assert sorted(os.listdir(tmp_path / "b")) == ["0.jpg", "1.jpg", "2.jpg"]
+
+    # a recovered batch can be undone like any other
+    log.undo()
+    assert sorted(os.listdir(tmp_path / "a")) == ["0.jpg", "1.jpg", "2.jpg"]
+
+
+def test_old_batches_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "UNDO_LEVELS", 2)
+    moves = _files(tmp_path, 4)
+    log = Journal(str(tmp_path))
+    for move in moves:
+        log.run([move])
+
+    assert len(os.listdir(log.directory)) == 2
+    assert log.undo() == [moves[3][::-1]]
+    assert log.undo() == [moves[2][::-1]]
+    assert log.undo() == []
+    assert os.path.exists(moves[1][1])
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+
+from pyphlow.data import library
+from pyphlow.data.library import Library
+from pyphlow.data.picture import Mode
+
+from tests.conftest import files
+
+
+def test_merges_shoots_by_name(make_shoot):
+    first = make_shoot("first", 3)
+    second = make_shoot("second", 2)
+
+    with Library([first, second], Mode.CATEGORIZING) as pictures:
+        names = [(root, picture.name) for root, picture in pictures]
+
+    assert names == [(first, "DSC00000"), (second, "DSC00000"),
+                     (first, "DSC00001"), (second, "DSC00001"),
+                     (first, "DSC00002")]
+
+
+def test_apply_rejecting_current_picture_at_frontier(shoot):
+    with Library([shoot], Mode.CATEGORIZING) as pictures:
+        pictures.next
+        # only the pictures up to the current one have been merged
+        assert len(pictures._seen) == 2
+
+        pictures.current.reject()
+        moves = pictures.apply()
+
+        assert list(moves) == [shoot]
+        assert pictures.position == 1
+        assert pictures.current.name == "DSC00002"
+        assert pictures.current_root == shoot
+
+    assert "DSC00001.JPG" not in files(shoot, "src/jpg")
+    assert "DSC00001.JPG" in files(shoot, "rejected/src/jpg")
+
+
+def test_apply_rejecting_last_picture_wraps_around(make_shoot):
+    root = make_shoot(count=2)
+
+    with Library([root], Mode.CATEGORIZING) as pictures:
+        pictures.next
+        pictures.current.reject()
+        pictures.apply()
+
+        assert pictures.position == 0
+        assert pictures.current.name == "DSC00000"
+
+
+def test_unreadable_catalog_is_reported(make_shoot, monkeypatch):
+    first = make_shoot("first", 2)
+    second = make_shoot("second", 2)
+
+    def fail(root, mode):
+        if root == second:
+            raise sqlite3.DatabaseError("file is not a database")
+        return opened(root, mode)
+
+    opened = library._open
+    monkeypatch.setattr(library, "_open", fail)
+
+    with Library([first, second], Mode.CATEGORIZING) as pictures:
+        assert [picture.name for _, picture in pictures] == [
+            "DSC00000", "DSC00001"
+        ]
+        assert pictures.pictures(second) is None
+        assert isinstance(pictures.errors[second], sqlite3.DatabaseError)
+
+
+def test_apply_leaves_raw_only_private_pictures(shoot):
+    os.remove(os.path.join(shoot, "src", "jpg", "DSC00000.JPG"))
+
+    with Library([shoot], Mode.CATEGORIZING) as pictures:
+        pictures.current.make_private()
+        pictures.next.reject()
+        pictures.apply()
+
+        assert [picture.name for _, picture in pictures][:2] == [
+            "DSC00000", "DSC00002"
+        ]
+        assert pictures.current.name == "DSC00002"
+
+    assert "DSC00000.ARW" in files(shoot, "src/arw")
+    assert files(shoot, "export/private") == []
@@ -0,0 +1,74 @@
+import os
+import queue
+
+from benchmarks.shoot import make_jpeg
+from pyphlow.data.picture import Mode
+from pyphlow.data.picturehandling import PictureManager
+
+from tests.conftest import files
+
+
+def _raw_only(root: str, name: str):
+    os.remove(os.path.join(root, "src", "jpg", f"{name}.JPG"))
+
+
+def test_apply_moves_files(shoot):
+    manager = PictureManager(shoot, Mode.CATEGORIZING)
+    manager.jump_to("DSC00001").reject()
+    manager.jump_to("DSC00002").make_private()
+    manager.apply()
+
+    assert [picture.name for picture in manager] == [
+        "DSC00000", "DSC00003", "DSC00004"
+    ]
+    assert files(shoot, "rejected/src/jpg") == ["DSC00001.JPG"]
+    assert files(shoot, "rejected/src/arw") == [
+        "DSC00001.ARW", "DSC00001.ARW.xmp", "DSC00002.ARW", "DSC00002.ARW.xmp"
+    ]
+    assert files(shoot, "export/private") == ["DSC00002.JPG"]
+
+
+def test_apply_leaves_raw_only_private_pictures(shoot):
+    _raw_only(shoot, "DSC00001")
+
+    manager = PictureManager(shoot, Mode.CATEGORIZING)
+    manager.jump_to("DSC00001").make_private()
+    manager.jump_to("DSC00002").reject()
+    manager.apply()
+
+    assert [picture.name for picture in manager] == [
+        "DSC00000", "DSC00001", "DSC00003", "DSC00004"
+    ]
+    assert manager.jump_to("DSC00001").action == "private"
+    assert "DSC00001.ARW" in files(shoot, "src/arw")
+    assert files(shoot, "export/private") == []
+    assert files(shoot, "rejected/src/jpg") == ["DSC00002.JPG"]
+
+
+def test_mode_switch_with_raw_only_private_picture(shoot):
+    _raw_only(shoot, "DSC00001")
+
+    manager = PictureManager(shoot, Mode.CATEGORIZING)
+    manager.jump_to("DSC00001").make_private()
+    manager.mode = Mode.VIEW_ALL
+
+    assert [picture.name for picture in manager] == ["No picture available"]
+    assert "DSC00001.ARW" in files(shoot, "src/arw")
+
+
+def test_watch_hands_changes_to_callback(shoot):
+    changes = queue.Queue()
+    manager = PictureManager(shoot, Mode.CATEGORIZING)
+    manager.watch(changes.put)
+    try:
+        with open(os.path.join(shoot, "src", "jpg", "DSC00009.JPG"),
+                  'wb') as f:
+            f.write(make_jpeg())
+        paths = changes.get(timeout=10)
+    finally:
+        manager.stop_watching()
+
+    # nothing changes until the owner of the manager refreshes it
+    assert len(manager) == 5
+    assert manager.refresh(paths)
+    assert [picture.name for picture in manager][-1] == "DSC00009"
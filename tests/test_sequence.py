@@ -0,0 +1,149 @@
+from pyphlow.data.picture import Mode, Picture, PictureTable
+from pyphlow.data.picturehandling import _merge
+from pyphlow.data.sequence import PictureSequence
+
+
+def _sequence(names, public=()) -> PictureSequence:
+    table = PictureTable(Mode.CATEGORIZING)
+    for name in names:
+        table.append(name, f"/shoot/src/jpg/{name}.JPG", name in public)
+    return PictureSequence(table)
+
+
+def _names(pictures) -> list:
+    return [picture.name for picture in pictures]
+
+
+def test_sorted_by_name():
+    pictures = _sequence(["c", "a", "b"])
+
+    assert _names(pictures) == ["a", "b", "c"]
+    assert pictures.current.name == "a"
+    assert pictures.find("b") == 1
+    assert pictures.find("x") == -1
+    assert pictures.jump_to("bb").name == "c"
+    assert pictures.move(1).name == "a"
+    assert pictures.move(-1).name == "c"
+
+
+def test_filters_follow_actions():
+    pictures = _sequence("abcde", public="d")
+
+    assert pictures.count("unrated") == 5
+    assert list(pictures.indices("public")) == [3]
+
+    pictures[1].reject()
+    pictures[2].make_private()
+
+    assert pictures.matching("unrated") == 0b11001
+    assert list(pictures.indices("rejected")) == [1]
+    assert list(pictures.indices("private")) == [2]
+
+    pictures[1].keep()
+    assert pictures.count("rejected") == 0
+    assert pictures.count("unrated") == 4
+
+
+def test_next_matching_wraps_around():
+    pictures = _sequence("abcde")
+    for index in (0, 1, 3):
+        pictures[index].reject()
+
+    assert pictures.next_matching("unrated").name == "c"
+    assert pictures.next_matching("unrated").name == "e"
+    assert pictures.next_matching("unrated").name == "c"
+    assert pictures.next_matching("unrated", -1).name == "e"
+    assert pictures.next_matching("rejected", -1).name == "d"
+
+    # the cursor stays if no other picture matches
+    assert pictures.next_matching("private").name == "d"
+
+
+def test_insert_shifts_bitsets_and_cursor():
+    pictures = _sequence("ace")
+    pictures[2].reject()
+    pictures.jump(1)
+
+    index = pictures.insert(Picture("b", "/shoot/src/jpg/b.JPG",
+                                    Mode.CATEGORIZING))
+
+    assert index == 1
+    assert _names(pictures) == ["a", "b", "c", "e"]
+    assert pictures.current.name == "c"
+    assert list(pictures.indices("rejected")) == [3]
+    assert pictures.count("unrated") == 3
+
+    # the inserted picture is a view onto the table of the sequence
+    pictures[1].reject()
+    assert list(pictures.indices("rejected")) == [1, 3]
+
+
+def test_remove_keeps_cursor():
+    pictures = _sequence("abcd")
+    pictures[3].reject()
+    pictures.jump(2)
+
+    assert pictures.remove(0).name == "a"
+    assert pictures.current.name == "c"
+    assert list(pictures.indices("rejected")) == [2]
+
+    pictures.remove(1)
+    assert pictures.current.name == "d"
+
+
+def test_remove_if():
+    pictures = _sequence("abcde")
+    pictures[1].reject()
+    pictures[2].reject()
+    pictures[4].make_private()
+    pictures.jump(1)
+
+    assert pictures.remove_if(lambda picture: picture.action == "reject") == 2
+    assert _names(pictures) == ["a", "d", "e"]
+    assert pictures.current.name == "d"
+    assert list(pictures.indices("private")) == [2]
+
+
+def test_extend():
+    pictures = _sequence("bd")
+    pictures[1].reject()
+
+    # sorted after all others, appended in bulk
+    pictures.extend([("e", "", False), ("f", "", True)])
+    # a few unsorted ones, inserted one by one
+    pictures.extend([("c", "", False), ("a", "", False)])
+    # many unsorted ones, merged
+    pictures.extend((f"c{i:02d}", "", False) for i in range(40, 0, -1))
+
+    names = _names(pictures)
+    assert names == sorted(names)
+    assert len(names) == 46
+    assert pictures.current.name == "b"
+    assert list(pictures.indices("rejected")) == [names.index("d")]
+    assert list(pictures.indices("public")) == [names.index("f")]
+
+
+def test_merge_applies_differences():
+    pictures = _sequence("abcd", public="a")
+    pictures[1].reject()
+    pictures.jump(2)
+
+    fresh = _sequence("bcde", public="bc")
+    assert _merge(pictures, fresh)
+
+    assert _names(pictures) == ["b", "c", "d", "e"]
+    assert pictures.current.name == "c"
+    # actions of pictures still present are kept
+    assert pictures[0].action == "reject"
+    assert list(pictures.indices("rejected")) == [0]
+    assert list(pictures.indices("public")) == [0, 1]
+
+    assert not _merge(pictures, _sequence("bcde", public="bc"))
+
+
+def test_merge_moves_cursor_off_removed_picture():
+    pictures = _sequence("abcd")
+    pictures.jump(1)
+
+    assert _merge(pictures, _sequence("acd"))
+    assert pictures.current.name == "c"
@@ -0,0 +1,60 @@
+import hashlib
+import os
+import stat
+
+import pytest
+
+from pyphlow import util
+
+
+def test_checksum(tmp_path):
+    path = tmp_path / "file"
+    data = os.urandom(util.CHUNK_SIZE + 10)
+    path.write_bytes(data)
+
+    assert util.checksum(str(path)) == hashlib.sha256(data).hexdigest()
+
+
+def test_atomic_write_replaces_target(tmp_path):
+    target = tmp_path / "sub" / "file.jpg"
+
+    with util.atomic_write(str(target)) as f:
+        f.write(b"new")
+        assert not target.exists()
+
+    assert target.read_bytes() == b"new"
+    assert os.listdir(tmp_path / "sub") == ["file.jpg"]
+
+
+def test_atomic_write_keeps_target_on_error(tmp_path):
+    target = tmp_path / "file.jpg"
+    target.write_bytes(b"old")
+
+    with pytest.raises(RuntimeError):
+        with util.atomic_write(str(target)) as f:
+            f.write(b"partial")
+            raise RuntimeError()
+
+    assert target.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["file.jpg"]
+
+
+def test_atomic_write_uses_default_permissions(tmp_path):
+    plain = tmp_path / "plain"
+    plain.write_bytes(b"")
+    target = tmp_path / "file"
+
+    with util.atomic_write(str(target)) as f:
+        f.write(b"")
+
+    assert (stat.S_IMODE(os.stat(target).st_mode) ==
+            stat.S_IMODE(os.stat(plain).st_mode))
+
+
+def test_save_json(tmp_path):
+    path = str(tmp_path / "manifest.json")
+
+    util.save_json(path, {"b": 1, "a": [2]})
+
+    with open(path) as f:
+        assert f.read() == '{\n "a": [\n  2\n ],\n "b": 1\n}'